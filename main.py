@@ -1,4 +1,5 @@
 import os
+import sys
 
 from mazemaster.utils.configuration import settings
 from mazemaster.app import app
@@ -22,6 +23,8 @@ def run_in_uvicorn() -> None:
         port=18890,
         log_level="info",
         reload=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop is not available on windows
+        http="httptools",  # both pulled in via uvicorn[standard]
     )
 
 
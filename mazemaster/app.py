@@ -1,11 +1,8 @@
-import asyncio
-import os
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional
 
-from fastapi import Depends, FastAPI
-from fastapi.encoders import jsonable_encoder
+from fastapi import FastAPI
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import ORJSONResponse, Response
 from loguru import logger
 
 from mazemaster import routers
@@ -46,6 +43,7 @@ app = FastAPI(
     contact={"name": "Henning Thieß", "url": "https://github.com/vroomfondel"},
     license_info={"name": "MIT", "url": "https://github.com/vroomfondel/mazemaster/LICENSE.txt"},
     openapi_tags=__app_tags_metadata,
+    default_response_class=ORJSONResponse,  # ExcelCoordinate is a str-subclass => natively handled by orjson
 )
 
 
@@ -61,20 +59,27 @@ async def startup_event() -> None:
 
     logger.info("Calling startup event")
 
+    import os
+
     from mazemaster.datastructures.models_and_schemas import KeyDesignation
     from mazemaster.utils import auth
+    from mazemaster.utils.datapersistence import backfill_token_expires_at_ts
 
     logger.debug(f"DETA_RUNTIME_DETECTED: {settings.deta_runtime_detected()}")
     logger.debug(f"TIMZEONE SET: {settings.TZ} || {os.getenv('TZ')}")
 
     if settings.JWT_KEYID == "AUTO":  # AUTO-setting matching keyid if KEYID is set to "AUTO"
-        kdes: KeyDesignation = KeyDesignation[settings.JWT_ALGORITHM]
+        kdes: KeyDesignation = auth._jwt_key_designation  # resolved once in auth
         keyid: Optional[str] = await auth.retrieve_AUTO_keyid(kdes)
         if not keyid:
             raise RuntimeError(f"Key with ID {keyid} and designation {kdes.value} not found.")
         settings.JWT_KEYID = keyid  # overwrite with selected...
         logger.info(f"AUTO-SELECTED KEYID={keyid} for JWT_ALGORITHM={kdes}")
 
+    await auth.retrieve_key(settings.JWT_KEYID, auth._jwt_key_designation)  # pre-warms the key-cache
+
+    await backfill_token_expires_at_ts()  # once => tokens of older deployments are counted as sessions again
+
 
 if settings.deta_runtime_detected():
     conf._startup_event_callable = startup_event
@@ -86,6 +91,13 @@ app.include_router(routers.mazes, prefix="/maze")
 app.include_router(routers.jwk, prefix="/.well-known")
 
 
+# constant probe-bodies => encoded once here instead of per probe-call
+_alive_json_body: bytes = b'{"status":"alive"}'
+_alive_text_body: bytes = b"status: alive"
+_ready_json_body: bytes = b'{"status":"ready"}'
+_ready_text_body: bytes = b"status: ready"
+
+
 def _wants_explicitly_json_response(request: Request) -> bool:
     ah: Optional[str] = request.headers.get("Accept")
     if ah and ah == "application/json":
@@ -93,28 +105,36 @@ def _wants_explicitly_json_response(request: Request) -> bool:
     return False
 
 
-@app.get("/healthz", tags=["k8s"])  # health-ping-endpoint | e.g. for k8s-deployment
-async def healthz(
-    wants_explicitly_json_response: bool = Depends(_wants_explicitly_json_response),
-) -> Union[JSONResponse, PlainTextResponse]:
+@app.get("/healthz", tags=["k8s"], include_in_schema=False)  # health-ping-endpoint | e.g. for k8s-deployment
+async def healthz(request: Request) -> Response:
     """retuns alive => to be used as liveness-probe"""
-    if wants_explicitly_json_response:
-        return JSONResponse(content=jsonable_encoder({"status": "alive"}))
+    if _wants_explicitly_json_response(request):  # kept for probes already configured with Accept-header
+        return Response(content=_alive_json_body, media_type="application/json")
     else:
         # assuming plain/text
-        return PlainTextResponse(content="status: alive")
+        return Response(content=_alive_text_body, media_type="text/plain")
+
 
+@app.get("/healthz.json", tags=["k8s"], include_in_schema=False)  # flat json-route -> no Accept-branching
+async def healthz_json() -> Response:
+    """retuns alive as json => to be used as liveness-probe"""
+    return Response(content=_alive_json_body, media_type="application/json")
 
-@app.get("/ready", tags=["k8s"])  # ready-ping-endpoint | e.g. for k8s-deployment
-async def health(
-    wants_explicitly_json_response: bool = Depends(_wants_explicitly_json_response),
-) -> Union[JSONResponse, PlainTextResponse]:
+
+@app.get("/ready", tags=["k8s"], include_in_schema=False)  # ready-ping-endpoint | e.g. for k8s-deployment
+async def health(request: Request) -> Response:
     """retuns ready => to be used as ready-probe"""
-    if wants_explicitly_json_response:
-        return JSONResponse(content=jsonable_encoder({"status": "ready"}))
+    if _wants_explicitly_json_response(request):  # kept for probes already configured with Accept-header
+        return Response(content=_ready_json_body, media_type="application/json")
     else:
         # assuming plain/text
-        return PlainTextResponse(content="status: ready")
+        return Response(content=_ready_text_body, media_type="text/plain")
+
+
+@app.get("/ready.json", tags=["k8s"], include_in_schema=False)  # flat json-route -> no Accept-branching
+async def health_json() -> Response:
+    """retuns ready as json => to be used as ready-probe"""
+    return Response(content=_ready_json_body, media_type="application/json")
 
 
 # include ROOT/static-routers last..
@@ -124,3 +144,9 @@ app.include_router(routers.ROOT)
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     logger.info("Calling shutdown event")
+
+    from mazemaster.solvers.dfs import shutdown_branch_executor
+    from mazemaster.utils.detadbwrapper import close_db_connections
+
+    shutdown_branch_executor()
+    close_db_connections()
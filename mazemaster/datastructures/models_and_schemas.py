@@ -1,43 +1,50 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import functools
+import hashlib
 import re
-import string
+import threading
 from enum import Enum, auto
-from functools import reduce
 from hashlib import sha256
-from re import Match, Pattern
-from typing import Any, List, Optional, Tuple, cast, AnyStr, Iterator, Literal
+from re import Pattern
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Generator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+    AnyStr,
+    Iterator,
+    Literal,
+)
 from uuid import UUID, uuid4
 
+import cachetools
 from loguru import logger
 from pydantic import (
     BaseModel,
     ConstrainedStr,
     Field,
+    PrivateAttr,
+    errors,
     root_validator,
     validate_model,
     validator,
 )
 
-from mazemaster.solvers.gridmodels import _excel_pattern_compiled
-from mazemaster.utils.datapersistence import (
-    delete_maze,
-    delete_user,
-    get_all_mazes_from_db_by_userid,
-    get_all_users_from_db,
-    get_maze_from_db_by_id,
-    get_maze_from_db_by_userid_and_hash,
-    get_maze_from_db_by_userid_and_mazenum,
-    get_maze_solution_from_db_by_hash,
-    get_user_from_db_by_id,
-    get_user_from_db_by_username,
-    save_maze,
-    save_maze_solution,
-    save_user,
-)
+from mazemaster.solvers.gridmodels import _excel_pattern_compiled, from_excel, is_excel_coordinate
 from mazemaster.utils.configuration import settings
 
+# NOTE: mazemaster.utils.datapersistence (and with it the db-layer) is imported in the methods actually talking to the db
+# => importing the schemas alone (openapi, tests, ...) does not drag in the db-layer
+
 
 _password_pattern = settings.PASSWORD_PATTERN
 _password_pattern_compiled = re.compile(_password_pattern)
@@ -49,10 +56,6 @@ _gridsize_pattern: str = settings.GRIDSIZE_PATTERN
 _gridsize_pattern_compiled: Pattern = re.compile(_gridsize_pattern)
 
 
-def from_excel(chars: str) -> int:
-    return reduce(lambda r, x: r * 26 + 1 + x, map(string.ascii_uppercase.index, chars), 0)
-
-
 class MStrEnum(str, Enum):
     """StrEnum is introduced in 3.11 and not available in runtime 3.9"""
 
@@ -100,17 +103,44 @@ class CheckableBaseModel(BaseModel):
     extended to be able to use field-name-alias as well as field-names for de-serializing
     """
 
+    _checked_fingerprint: Optional[tuple] = PrivateAttr(default=None)
+
+    def _fingerprint(self) -> tuple:
+        """cheap snapshot of the field-values (lists as tuples => in-place mutations are detected as well)"""
+        return tuple(tuple(v) if isinstance(v, list) else v for v in self.__dict__.values())
+
     def check(self) -> None:
+        """re-validates the model => skipped if nothing changed since the last successful check"""
+        fingerprint: tuple = self._fingerprint()
+        if fingerprint == self._checked_fingerprint:
+            return
+
         *_, validation_error = validate_model(self.__class__, self.__dict__)
         if validation_error:
             raise validation_error
 
+        self._checked_fingerprint = fingerprint
+
     class Config:
         allow_population_by_field_name = True
 
 
 class ExcelCoordinate(ConstrainedStr):
-    regex: Pattern[str] = _excel_pattern_compiled
+    regex: Pattern[str] = _excel_pattern_compiled  # still used for the pattern in the schema
+
+    @classmethod
+    def __get_validators__(cls) -> Generator[Callable, None, None]:
+        # one validator per item instead of the whole ConstrainedStr-chain (str, strip, upper, lower, length, regex)
+        # => matters for walls with hundreds of entries
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: Any) -> str:
+        if not isinstance(value, str):
+            raise errors.StrError()
+        if not is_excel_coordinate(value):
+            raise errors.StrRegexError(pattern=_excel_pattern_compiled.pattern)
+        return value
 
 
 class GridSize(ConstrainedStr):  # using GridSize = pydantic.constr(regex=_gridsize_pattern) causes mypy to complain!
@@ -190,10 +220,26 @@ class UserOther(BaseModel):
     id: UUID
     # usertype: UserType
 
+    @staticmethod
+    async def iter_users_for(me: MazeUser) -> AsyncIterator[Union[UserSelf, UserOther]]:
+        """
+        all users as seen by 'me' => built straight from the db-rows (page by page) with only the visible fields,
+        no full MazeUser (incl. password-hash) is constructed per row
+        """
+        from mazemaster.utils.datapersistence import iter_all_users_from_db
+
+        userdata: dict
+        async for userdata in iter_all_users_from_db():
+            userid: UUID = UUID(userdata["id"])
+            if userid == me.id:
+                yield UserSelf(id=userid, username=userdata["username"])
+            else:
+                yield UserOther(id=userid)
+
 
 def _pydantic_username_validator(value: str) -> str:
     """extra validator for username-validation"""
-    if not _username_pattern_compiled.match(value):
+    if not _username_pattern_compiled.fullmatch(value):
         raise ValueError("username pattern does not match")
     return value
 
@@ -236,6 +282,8 @@ class UserWithPasswordHashAndID(UserName):  # UserWithNameAndType):
     async def get_user(
         username: Optional[UserName] = None, userid: Optional[UUID] = None
     ) -> Optional[MazeUser]:  # sanitizes lookup via pydantic + validator
+        from mazemaster.utils.datapersistence import get_user_from_db_by_id, get_user_from_db_by_username
+
         assert (username and not userid) or (userid and not username), f"username XOR userid may be supplied"
 
         userdict: Optional[dict] = None
@@ -251,6 +299,8 @@ class UserWithPasswordHashAndID(UserName):  # UserWithNameAndType):
 
     @staticmethod
     async def get_all_users() -> List[MazeUser]:
+        from mazemaster.utils.datapersistence import get_all_users_from_db
+
         userdicts: List[dict] = await get_all_users_from_db()
 
         ret: List[MazeUser] = []
@@ -263,12 +313,16 @@ class UserWithPasswordHashAndID(UserName):  # UserWithNameAndType):
         return ret
 
     async def save(self) -> Optional[MazeUser]:
+        from mazemaster.utils.datapersistence import save_user
+
         data_saved: dict = await save_user(self.id, self.username, self.dict())
 
         retb: MazeUser = cast(MazeUser, self.copy(update=data_saved))
         return retb
 
     async def create_new(self) -> Optional[MazeUser]:
+        from mazemaster.utils.datapersistence import save_user
+
         data_saved: dict = await save_user(self.id, self.username, self.dict(), new_user=True)
 
         rets: MazeUser = cast(MazeUser, self.copy(update=data_saved))
@@ -276,6 +330,8 @@ class UserWithPasswordHashAndID(UserName):  # UserWithNameAndType):
         return rets
 
     async def delete_me(self) -> None:
+        from mazemaster.utils.datapersistence import delete_user
+
         await delete_user(self.id)
 
 
@@ -283,6 +339,22 @@ class MazeUser(UserWithPasswordHashAndID):
     ...
 
 
+@cachetools.cached(cache=cachetools.LRUCache(maxsize=1024))
+def _parse_grid_size(grid_size: str) -> Tuple[int, int]:
+    """WIDTH,HEIGHT of an already validated grid_size => plain split instead of another regex-match; memoized"""
+    width, _, height = grid_size.partition("x")
+    return int(width), int(height)
+
+
+@functools.lru_cache(maxsize=256)
+def _maze_hash_prefix(entrance: str, grid_size: str) -> hashlib._Hash:
+    """
+    sha256-context after consuming entrance + grid_size => mazes sharing both only hash their walls (on a .copy())
+    the cached context itself is never updated => safe to be shared between threads
+    """
+    return sha256((entrance + grid_size).encode("utf8"))
+
+
 class MazeInput(CheckableBaseModel):
     """maze datatype for posting maze-model from users"""
 
@@ -312,14 +384,11 @@ class MazeInput(CheckableBaseModel):
     @staticmethod
     def static_get_maze_hash(grid_size: GridSize, entrance: ExcelCoordinate, walls: List[ExcelCoordinate]) -> str:
         """also sorts the list!!!"""
-        m = sha256()
-
-        m.update(entrance.encode("utf8"))
-        m.update(grid_size.encode("utf8"))
-
-        for w in sorted(walls):  # , key=lambda x: x.value):
-            m.update(w.encode("utf8"))
-        return m.hexdigest()
+        # str-join + a single encode => walls are sorted as str (codepoint-order == utf8-byte-order)
+        # NOTE: no separators on purpose -> would change the digest of all mazes already stored
+        mazehash: hashlib._Hash = _maze_hash_prefix(entrance, grid_size).copy()
+        mazehash.update("".join(sorted(walls)).encode("utf8"))
+        return mazehash.hexdigest()
 
     def get_maze_hash(self) -> str:
         return Maze.static_get_maze_hash(grid_size=self.grid_size, entrance=self.entrance, walls=self.walls)
@@ -333,11 +402,7 @@ class MazeInput(CheckableBaseModel):
 
     def get_grid_size_as_int_tuple(self) -> Tuple[int, int]:
         """return grid_size as int-tuple WIDTH,HEIGHT"""
-        match: Optional[Match] = _gridsize_pattern_compiled.match(self.grid_size)
-        if not match:
-            # should never come here since everything is pre-check; alternatively raise error
-            return -1, -1
-        return int(match.groups()[0]), int(match.groups()[1])
+        return _parse_grid_size(self.grid_size)
 
 
 class Maze(MazeInput):
@@ -352,70 +417,144 @@ class Maze(MazeInput):
 
     @validator("hash", always=True)
     def _validate_hash(cls, value: str, values: dict) -> str:
-        """rather sets the hash than validates it!!!"""
+        """rather sets the hash than validates it!!! => trusts an already given hash (e.g. the one stored in db)"""
+        if value:
+            return value
+
         return Maze.static_get_maze_hash(
             entrance=values["entrance"], grid_size=values["grid_size"], walls=values["walls"]
         )
 
+    @classmethod
+    def construct_from_db(cls, maze_dict: dict) -> Maze:
+        """
+        trusted data from db => no validation (and no re-hashing of all the walls) on every read
+        only the uuids need converting since they are stored as str; extra db-fields (e.g. "key") are dropped
+        """
+        values: dict = {name: maze_dict[name] for name in cls.__fields__ if name in maze_dict}
+        if not values.get("hash"):  # not written by us -> take the long road
+            return cls(**maze_dict)
+
+        values["id"] = UUID(str(values["id"]))
+        values["owner_id"] = UUID(str(values["owner_id"]))
+
+        return cls.construct(**values)
+
     @staticmethod
     async def get_maze_by_mazeid(mazeid: UUID) -> Optional[Maze]:
+        from mazemaster.utils.datapersistence import get_maze_from_db_by_id
+
         maze_dict: Optional[dict] = await get_maze_from_db_by_id(mazeid)
         logger.debug(f"{maze_dict=}")
         if not maze_dict:
             return None
 
-        return Maze(**maze_dict)
+        return Maze.construct_from_db(maze_dict)
 
     @staticmethod
     async def get_maze_by_userid_and_hash(userid: UUID, hash: str) -> Optional[Maze]:
+        from mazemaster.utils.datapersistence import get_maze_from_db_by_userid_and_hash
+
         maze_dict: Optional[dict] = await get_maze_from_db_by_userid_and_hash(userid, hash)
         logger.debug(f"{maze_dict=}")
         if not maze_dict:
             return None
 
-        return Maze(**maze_dict)
+        return Maze.construct_from_db(maze_dict)
 
     @staticmethod
     async def get_maze_by_userid_and_mazenum(userid: UUID, mazenum: int) -> Optional[Maze]:
+        from mazemaster.utils.datapersistence import get_maze_from_db_by_userid_and_mazenum
+
         maze_dict: Optional[dict] = await get_maze_from_db_by_userid_and_mazenum(userid=userid, mazenum=mazenum)
         logger.debug(f"{maze_dict=}")
         if not maze_dict:
             return None
 
-        return Maze(**maze_dict)
+        return Maze.construct_from_db(maze_dict)
+
+    @staticmethod
+    async def get_maze_with_solution_by_userid_and_mazenum(
+        userid: UUID, mazenum: int
+    ) -> Tuple[Optional[Maze], Optional[MazeSolution]]:
+        """
+        maze and its (probably not yet existing) solution
+        => the lookup-entry (owner_id, mazenum) carries the maze-hash, hence maze and solution are fetched in parallel
+        (one round-trip less); without a usable entry (none yet, written before it carried the hash, stale) the maze is
+        looked up first, which (re-)writes the entry
+        """
+        from mazemaster.utils.datapersistence import get_maze_index_entry_by_userid_and_mazenum
+
+        maze: Optional[Maze]
+        solution: Optional[MazeSolution]
+
+        index_entry: Optional[Tuple[UUID, str]] = await get_maze_index_entry_by_userid_and_mazenum(
+            userid=userid, mazenum=mazenum
+        )
+        if index_entry:
+            mazeid, mazehash = index_entry
+            maze, solution = await asyncio.gather(
+                Maze.get_maze_by_mazeid(mazeid), MazeSolution.get_solution_for_maze(mazehash)
+            )
+            if maze and maze.owner_id == userid and maze.mazenum == mazenum and maze.hash == mazehash:
+                return maze, solution
+
+        maze = await Maze.get_maze_by_userid_and_mazenum(userid=userid, mazenum=mazenum)
+        if not maze:
+            return None, None
+
+        return maze, await MazeSolution.get_solution_for_maze(maze.hash)
 
     @staticmethod
     async def delete_all_mazes_belonging_to_user(userid: UUID) -> None:
-        mazeids: List[dict] = await get_all_mazes_from_db_by_userid(userid)
+        from mazemaster.utils.datapersistence import delete_mazes, get_all_mazes_from_db_by_userid
 
-        to_delete_mazes: List[Maze] = []
-        for pd in mazeids:
-            p: Maze = Maze(**pd)
-            to_delete_mazes.append(p)
+        # raw ids only -> no Maze(**pd) (=validation + hashing) per maze just to delete it
+        mazeids: List[UUID] = [UUID(pd["id"]) for pd in await get_all_mazes_from_db_by_userid(userid)]
 
-        for delmaze in to_delete_mazes:
-            await delmaze.delete()
+        logger.debug(f"Deleting {len(mazeids)} mazes of user {userid}")
+        await delete_mazes(mazeids)
 
     async def save(self) -> Maze:
-        data_saved: dict = await save_maze(self.id, self.dict())
+        from mazemaster.utils.datapersistence import save_maze
+
+        data_saved: dict = await save_maze(self.id, dict(self))  # flat model -> no recursive .dict()-walk needed
         ret: Maze = self.copy(update=data_saved)
         return ret
 
     async def delete(self) -> None:
+        from mazemaster.utils.datapersistence import delete_maze
+
         logger.debug(f"Deleting maze: {self.id}")
         await delete_maze(self.id)
 
     async def create_new(self) -> Maze:
-        all_user_mazes_dict: List[dict] = await get_all_mazes_from_db_by_userid(
-            userid=self.owner_id
-        )  # inefficient -> something like "count" would be nice -> not available in deta-base ?!
-        self.mazenum = len(all_user_mazes_dict) + 1
+        from mazemaster.utils.datapersistence import get_next_mazenum_for_user, save_maze
 
-        data_saved: dict = await save_maze(self.id, self.dict(), new_maze=True)
+        self.mazenum = await get_next_mazenum_for_user(userid=self.owner_id)
+
+        data_saved: dict = await save_maze(self.id, dict(self), new_maze=True)
         ret: Maze = self.copy(update=data_saved)
         return ret
 
 
+# solutions in these states do not change anymore => safe to be served from process-local cache (even with several
+# workers); SOLVED_MIN may still get a max-solution and SYSTEM_FAIL/PROCESSING/NEW are transient
+_final_solution_states: frozenset = frozenset(
+    {
+        MazeSolutionStatus.SOLVED_MAX,
+        MazeSolutionStatus.FAILED_MAX,
+        MazeSolutionStatus.INVALID_GEOMETRY,
+        MazeSolutionStatus.INVALID_ENTRY_INWALL,
+        MazeSolutionStatus.INVALID_ENTRY_OUTOFBOUNDS,
+        MazeSolutionStatus.INVALID_NOEXIT,
+        MazeSolutionStatus.INVALID_MULTIEXIT,
+    }
+)
+_final_solution_cache: cachetools.TTLCache = cachetools.TTLCache(maxsize=1024, ttl=3600)  # mazehash -> MazeSolution
+_final_solution_cache_lock: threading.Lock = threading.Lock()  # solutions are also saved from the solver-threads
+
+
 class MazeSolution(BaseModel):
     """
     data schema/model being used as the response for a resolution for a maze
@@ -430,32 +569,60 @@ class MazeSolution(BaseModel):
 
     @staticmethod
     async def get_solution_for_maze(mazehash: str) -> Optional[MazeSolution]:
+        from mazemaster.utils.datapersistence import get_maze_solution_from_db_by_hash
+
+        with _final_solution_cache_lock:
+            cached: Optional[MazeSolution] = _final_solution_cache.get(mazehash)
+        if cached:
+            return cached.copy()
+
         solution_dict: Optional[dict] = await get_maze_solution_from_db_by_hash(mazehash)
         logger.debug(f"{solution_dict=}")
         if not solution_dict:
             return None
 
-        return MazeSolution(**solution_dict)
+        ret: MazeSolution = MazeSolution(**solution_dict)
+        ret._update_cache()
 
-    async def save(self) -> MazeSolution:
-        dict_me: dict = self.dict()
-        dict_me["status"] = self.status.value
+        return ret
+
+    def _update_cache(self) -> None:
+        with _final_solution_cache_lock:
+            if self.status in _final_solution_states:
+                _final_solution_cache[self.mazehash] = self.copy()
+            else:
+                _final_solution_cache.pop(self.mazehash, None)
+
+    async def save(self, fields: Optional[Set[str]] = None) -> MazeSolution:
+        """:param fields: only these fields are written (e.g. {"status"} for a mere state-transition)"""
+        from mazemaster.utils.datapersistence import save_maze_solution
+
+        # flat model -> shallow copy suffices, the db-layer json-mangles it anyway
+        # (status is a str-enum => json-encoded as its plain str-value, no .value-override needed)
+        dict_me: dict = dict(self) if fields is None else {field: getattr(self, field) for field in fields}
 
         logger.debug(dict_me)
 
         data_saved: dict = await save_maze_solution(self.id, dict_me)
         ret: MazeSolution = self.copy(update=data_saved)
+        ret._update_cache()
 
         return ret
 
     async def delete(self) -> None:
+        from mazemaster.utils.datapersistence import delete_maze
+
         await delete_maze(self.id)
 
     async def create_new(self) -> MazeSolution:
-        dict_me: dict = self.dict()
-        dict_me["status"] = self.status.value
+        from mazemaster.utils.datapersistence import save_maze_solution
+
+        # flat model -> shallow copy suffices, the db-layer json-mangles it anyway
+        # (status is a str-enum => json-encoded as its plain str-value, no .value-override needed)
+        dict_me: dict = dict(self)
         data_saved: dict = await save_maze_solution(self.id, dict_me, new_solution=True)
         ret: MazeSolution = self.copy(update=data_saved)
+        ret._update_cache()
         return ret
 
 
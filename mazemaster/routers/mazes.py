@@ -1,8 +1,9 @@
-from concurrent.futures import Future
-from typing import List, Literal, Optional, Union, cast
+import asyncio
+from typing import Dict, List, Literal, Optional, Tuple, Union
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
 from loguru import logger
 
 from mazemaster.datastructures.models_and_schemas import (
@@ -17,6 +18,7 @@ from mazemaster.datastructures.models_and_schemas import (
 )
 from mazemaster.utils.auth import (
     get_current_user,
+    responses_202_401_403_404_409,
     responses_401_403_404,
     responses_401_403_404_409,
     responses_401_422,
@@ -30,6 +32,9 @@ from mazemaster.utils.mazesolverhelper import (
 
 router = APIRouter(tags=["mazes"])
 
+# solver-runs currently in flight in this process => concurrent requests for the same maze+steps await the same run
+_inflight_solutions: Dict[Tuple[str, str], asyncio.Future] = {}
+
 
 @router.post(
     "",
@@ -56,7 +61,7 @@ async def create_maze(
         grid_size=maze_data.grid_size,
         entrance=maze_data.entrance,
         walls=maze_data.walls,
-        hash=maze_data.get_maze_hash(),
+        hash=hash,
     )
 
     new_maze = await new_maze.create_new()  # shifts to and from DB
@@ -150,51 +155,75 @@ async def delete_maze_by_mazeid(mazeid: UUID, maze_user: MazeUser = Depends(get_
     await maze.delete()
 
 
+# status -> (http-status, detail) => one dict-lookup instead of an if/elif-cascade per solution-request
+_solution_errors: Dict[MazeSolutionStatus, Tuple[int, str]] = {
+    MazeSolutionStatus.PROCESSING: (
+        status.HTTP_409_CONFLICT,  # nevertheless, 429 does not seem fitting
+        "There is already a solving-process running... please try again later",
+    ),
+    MazeSolutionStatus.INVALID_MULTIEXIT: (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "The maze has more than one exit and is invalid as such.",
+    ),
+    MazeSolutionStatus.INVALID_NOEXIT: (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "The maze has no reachable exit and is invalid as such.",
+    ),
+    MazeSolutionStatus.INVALID_GEOMETRY: (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "The maze has no reachable exit and is invalid as such.",
+    ),
+    MazeSolutionStatus.INVALID_ENTRY_INWALL: (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "The entrance to the maze is in a wall and is invalid as such.",
+    ),
+    MazeSolutionStatus.INVALID_ENTRY_OUTOFBOUNDS: (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "The entrance to the maze is not even inside the maze and is invalid as such.",
+    ),
+    MazeSolutionStatus.SYSTEM_FAIL: (
+        status.HTTP_500_INTERNAL_SERVER_ERROR,
+        "Unfortunately, the system could not compute the solution to the maze with hash={mazehash}",
+    ),
+}
+
+_solution_errors_max: Dict[MazeSolutionStatus, Tuple[int, str]] = _solution_errors | {
+    MazeSolutionStatus.FAILED_MAX: (
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "The maze is probably too complex to be solved here... sorry :-/",
+    ),
+}
+
+
 def raise_solution_error_if_needed(solution: MazeSolution, mazehash: str, also_max_fail: bool = False) -> None:
-    # structural pattern matching -> 3.10!
-    if also_max_fail:
-        if solution.status == MazeSolutionStatus.FAILED_MAX:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="The maze is probably too complex to be solved here... sorry :-/",
-            )
-
-    if solution.status == MazeSolutionStatus.PROCESSING:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="There is already a solving-process running... please try again later",
-        )  # nevertheless, 429 does not seem fitting
-    elif solution.status == MazeSolutionStatus.INVALID_MULTIEXIT:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="The maze has more than one exit and is invalid as such.",
-        )
-    elif solution.status == MazeSolutionStatus.INVALID_NOEXIT:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="The maze has no reachable exit and is invalid as such.",
-        )
-    elif solution.status == MazeSolutionStatus.INVALID_GEOMETRY:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="The maze has no reachable exit and is invalid as such.",
-        )
-    elif solution.status == MazeSolutionStatus.INVALID_ENTRY_INWALL:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="The entrance to the maze is in a wall and is invalid as such.",
-        )
-    elif solution.status == MazeSolutionStatus.INVALID_ENTRY_OUTOFBOUNDS:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="The entrance to the maze is not even inside the maze and is invalid as such.",
-        )
-    elif solution.status == MazeSolutionStatus.SYSTEM_FAIL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Unfortunately, the system could not compute the solution to the maze with hash={mazehash}",
-        )
-    # /ugly endif-cascade
+    error: Optional[Tuple[int, str]] = (_solution_errors_max if also_max_fail else _solution_errors).get(
+        solution.status
+    )
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1].format(mazehash=mazehash))
+
+
+def _solution_accepted_response(mazehash: str) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"detail": "Solution is being processed... please poll again", "mazehash": mazehash},
+    )
+
+
+async def _await_solver_run(run: asyncio.Future, mazehash: str) -> Optional[MazeSolutionOut]:
+    """awaits the solver-run (might be shared with other requests) for max. 8s
+    => 8s timeout -> deta has 10s timeout per request; shielded => a timeout must not cancel the solver-run itself
+    which is still running (and probably awaited by others)
+    """
+    try:
+        path: Optional[List[ExcelCoordinate]] = await asyncio.wait_for(asyncio.shield(run), timeout=8)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=500, detail="Solution is still being processed... please come back later")
+
+    if path:
+        return MazeSolutionOut(path=path, mazehash=mazehash)
+
+    return None
 
 
 @router.get(
@@ -202,25 +231,46 @@ def raise_solution_error_if_needed(solution: MazeSolution, mazehash: str, also_m
     response_model=MazeSolutionOut,
     response_model_exclude_none=True,
     status_code=status.HTTP_200_OK,
-    responses=responses_401_403_404_409,
+    responses=responses_202_401_403_404_409,
 )
 async def get_mazesolution_by_mazenum(
-    mazenum: int, steps: Literal["min", "max"] = Query(), maze_user: MazeUser = Depends(get_current_user)
-) -> Optional[MazeSolutionOut]:
+    mazenum: int,
+    steps: Literal["min", "max"] = Query(),
+    wait: bool = Query(default=True),
+    maze_user: MazeUser = Depends(get_current_user),
+) -> Optional[Union[MazeSolutionOut, ORJSONResponse]]:
     """get maze solution for maze by mazenum"""
 
-    ret: Optional[MazeSolutionOut] = None
-
-    maze: Optional[Maze] = await Maze.get_maze_by_userid_and_mazenum(maze_user.id, mazenum)
+    maze: Optional[Maze]
+    solution: Optional[MazeSolution]
+    maze, solution = await Maze.get_maze_with_solution_by_userid_and_mazenum(maze_user.id, mazenum)
     if not maze:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"maze with num {mazenum} not found for this user with userid={maze_user.id}",
         )
 
+    return await _resolve_solution(maze=maze, solution=solution, steps=steps, wait=wait)
+
+
+async def _resolve_solution(
+    maze: Maze, solution: Optional[MazeSolution], steps: Literal["min", "max"], wait: bool = True
+) -> Optional[Union[MazeSolutionOut, ORJSONResponse]]:
+    """
+    the actual solution-handling for an already loaded (and owner-checked) maze and its solution (if already there)
+    => shared by the by-mazenum and by-id endpoints
+    => wait=False: do not wait for a solver-run in the pool, but answer 202 right away => client polls again
+    """
+    ret: Optional[Union[MazeSolutionOut, ORJSONResponse]] = None
+
     maze_hash = maze.hash
 
-    solution: Optional[MazeSolution] = await MazeSolution.get_solution_for_maze(maze_hash)
+    inflight: Optional[asyncio.Future] = _inflight_solutions.get((maze_hash, steps))
+    if inflight:
+        if not wait:
+            return _solution_accepted_response(maze_hash)
+        return await _await_solver_run(inflight, maze_hash)
+
     if not solution:
         solution = MazeSolution(mazehash=maze_hash)
         solution = await solution.create_new()
@@ -237,23 +287,15 @@ async def get_mazesolution_by_mazenum(
             ret = MazeSolutionOut(path=solution.solution_max, mazehash=solution.mazehash)
         else:
             # also creates min-solution if missing
-            res: Optional[Union[Future, List[ExcelCoordinate]]] = await trigger_solver(
-                solution=solution, maze=maze, steps=steps
-            )
-            if res:
-                path: Optional[List[ExcelCoordinate]] = None
-                if type(res) == Future:
-                    try:
-                        path = res.result(timeout=8)  # type: ignore # 8s timeout -> deta has 10s timeout per request
-                        if path:
-                            ret = MazeSolutionOut(path=path, mazehash=solution.mazehash)
-                    except TimeoutError as te:
-                        raise HTTPException(
-                            status_code=500, detail="Solution is still being processed... please come back later"
-                        )
-                else:
-                    path = cast(List[ExcelCoordinate], res)
-                    ret = MazeSolutionOut(path=path, mazehash=solution.mazehash)
+            run: Optional[asyncio.Task] = await trigger_solver(solution=solution, maze=maze, steps=steps)
+            if run:
+                key: Tuple[str, str] = (maze_hash, steps)
+                _inflight_solutions[key] = run
+                run.add_done_callback(lambda _: _inflight_solutions.pop(key, None))
+
+                if not wait:
+                    return _solution_accepted_response(maze_hash)
+                ret = await _await_solver_run(run, maze_hash)
             else:
                 # re-read status from db
                 solution = await MazeSolution.get_solution_for_maze(maze_hash)
@@ -272,11 +314,14 @@ async def get_mazesolution_by_mazenum(
     response_model=MazeSolutionOut,
     response_model_exclude_none=True,
     status_code=status.HTTP_200_OK,
-    responses=responses_401_403_404_409,
+    responses=responses_202_401_403_404_409,
 )
 async def get_mazesolution_by_mazeid(
-    mazeid: UUID, steps: Literal["min", "max"] = Query(), maze_user: MazeUser = Depends(get_current_user)
-) -> Optional[MazeSolutionOut]:
+    mazeid: UUID,
+    steps: Literal["min", "max"] = Query(),
+    wait: bool = Query(default=True),
+    maze_user: MazeUser = Depends(get_current_user),
+) -> Optional[Union[MazeSolutionOut, ORJSONResponse]]:
     """get maze solution for maze by id"""
 
     maze: Optional[Maze] = await Maze.get_maze_by_mazeid(mazeid)
@@ -291,4 +336,6 @@ async def get_mazesolution_by_mazeid(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"maze with id does not belong to user id={maze_user.id}"
         )
 
-    return await get_mazesolution_by_mazenum(mazenum=maze.mazenum, steps=steps, maze_user=maze_user)
+    solution: Optional[MazeSolution] = await MazeSolution.get_solution_for_maze(maze.hash)
+
+    return await _resolve_solution(maze=maze, solution=solution, steps=steps, wait=wait)
@@ -35,8 +35,8 @@ from ..utils.auth import (
     myratelimit,
     responses_401,
     responses_403_429,
-    verify_password,
-    create_password_hash,
+    verify_password_async,
+    create_password_hash_async,
 )
 from ..utils.configuration import settings
 from starlette.background import BackgroundTasks
@@ -61,7 +61,7 @@ async def create_user(userregisterdata: UserWithPassword) -> Optional[MazeUser]:
     cachetools (and not using slowapi or such) "for fun and profit"
     """
 
-    hashed_pw: str = auth.create_password_hash(userregisterdata.password)
+    hashed_pw: str = await auth.create_password_hash_async(userregisterdata.password)
     datadict: dict
     new_user_db: Optional[MazeUser]
     try:
@@ -80,8 +80,7 @@ async def create_user(userregisterdata: UserWithPassword) -> Optional[MazeUser]:
 )
 async def read_users(me: MazeUser = Depends(get_current_user)) -> List[Union[UserSelf, UserOther]]:
     """get all users currently in 'DB' and print their userid+usertype; print full self-data for user-self"""
-    dd: List[MazeUser] = await UserWithPasswordHashAndID.get_all_users()
-    return [UserOther(**ud.dict()) if ud.id != me.id else UserSelf(**ud.dict()) for ud in dd]
+    return [ud async for ud in UserOther.iter_users_for(me)]
 
 
 @router.post(
@@ -173,7 +172,7 @@ async def login_for_access_token(request: Request, form_data: UnScopedOAuth2Pass
     logger.debug(f"{form_data.username=} {form_data.password=}")
     user: Optional[MazeUser] = await UserWithPasswordHashAndID.get_user(UserName(username=form_data.username))
     logger.debug(f"Return USER: {user}")
-    if not user or not verify_password(form_data.password, user.password_hashed):
+    if not user or not await verify_password_async(form_data.password, user.password_hashed):
         raise CredentialsException()
 
     request_url_base: str = str(request.base_url)
@@ -209,14 +208,10 @@ async def read_user_me(me: MazeUser = Depends(get_current_user)) -> UserSelf:
 async def update_user(userpass: UserPassword, me: MazeUser = Depends(get_current_user)) -> Optional[MazeUser]:
     """updates the user - in this regard only changeable data atm is password."""
 
-    hashed_pw: str = create_password_hash(userpass.password)
+    hashed_pw: str = await create_password_hash_async(userpass.password)
     me.password_hashed = hashed_pw
 
-    saved_user: Optional[MazeUser] = me.copy(update=me.dict())
-    if saved_user:
-        return await saved_user.save()
-
-    return None
+    return await me.save()
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT, response_model_exclude_none=True, responses=responses_401)
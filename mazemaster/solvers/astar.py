@@ -1,188 +1,226 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Set
-
-from loguru import logger
+from typing import List, Optional, Set, Tuple
 
+from mazemaster.solvers.flatgrid import (
+    bfs_flat,
+    exit_nodes_from_flat_bfs,
+    nodes_from_flat_path,
+)
 from mazemaster.solvers.gridmodels import (
     GoalInWallException,
     GoalOutOfBoundsException,
     GridLocation,
     GridNode,
-    PriorityQueue,
     SquareGrid,
     StartInWallException,
     StartOutOfBoundsException,
 )
 
 
-class AstarSolver:
-    @staticmethod
-    def search_all_available_exits(grid: SquareGrid, start: GridLocation) -> List[GridNode]:
-        """special case when exit is not defined, but exit is on the bottom most line"""
-        if start in grid.walls:
-            raise StartInWallException("invalid start location => start is in wall")
-
-        if start.col < 0 or start.row >= grid.dimension.width:
-            raise StartOutOfBoundsException("invalid start location => start is out of bounds")
-
-        goalline: int = grid.dimension.height - 1
-        current_pseudo_goal: GridLocation = GridLocation(col=start.col, row=goalline)  # same col, last row
-        # worklist
-        frontier: PriorityQueue[GridNode] = PriorityQueue()
-        frontier.put(
-            0.0,
-            GridNode(
-                location=start, parent=None, cost=0.0, heuristic=grid.manhattan_heuristic(start, current_pseudo_goal)
-            ),
-        )
-
-        ret: List[GridNode] = []  # return empty list if no exit found
+def _astar_flat(passable: bytearray, width: int, height: int, start: int, goal: int) -> Optional[List[int]]:
+    """
+    A* on plain ints (flat index per location) with a parent-array instead of a GridNode per expansion
+    => the GridNode-chain is only built once for the path found (see nodes_from_flat_path)
+    unit-steps + manhattan-heuristic => a neighbor's f is either the same as the current one (step towards the goal) or
+    f+2 => two buckets (f, f+2) instead of a heap; LIFO within a bucket => on same f the deeper node is expanded first
+    :return: path of flat indices from start to goal (both included) or None if goal not reachable
+    """
+    if not passable[goal]:
+        return None
 
-        explored: Dict[GridLocation, float] = {}
+    goal_row, goal_col = divmod(goal, width)
+    parent: List[int] = [-1] * len(passable)
+    cost: List[int] = [-1] * len(passable)
+    cost[start] = 0
+
+    row: int
+    col: int
+
+    # (g, idx) => f == current f / f == current f + 2
+    bucket_f: List[Tuple[int, int]] = [(0, start)]
+    bucket_f2: List[Tuple[int, int]] = []
+
+    while bucket_f or bucket_f2:
+        if not bucket_f:
+            bucket_f, bucket_f2 = bucket_f2, bucket_f
+
+        g, idx = bucket_f.pop()
+        if idx == goal:
+            break
+
+        if g > cost[idx]:  # stale entry -> already expanded via a cheaper path
+            continue
+
+        row, col = divmod(idx, width)
+        h: int = abs(row - goal_row) + abs(col - goal_col)
+        neigh_cost: int = g + 1
+
+        for neighbor, neigh_row, neigh_col, in_bounds in (
+            (idx + 1, row, col + 1, col + 1 < width),  # E
+            (idx - 1, row, col - 1, col > 0),  # W
+            (idx - width, row - 1, col, row > 0),  # N
+            (idx + width, row + 1, col, row + 1 < height),  # S
+        ):
+            if not in_bounds or not passable[neighbor]:
+                continue
+
+            if cost[neighbor] < 0 or neigh_cost < cost[neighbor]:
+                cost[neighbor] = neigh_cost
+                parent[neighbor] = idx
+                if abs(neigh_row - goal_row) + abs(neigh_col - goal_col) < h:
+                    bucket_f.append((neigh_cost, neighbor))
+                else:
+                    bucket_f2.append((neigh_cost, neighbor))
+    else:
+        return None
 
-        # keep going while there is more to explore
-        while not frontier.is_empty():
-            current_node: GridNode
-            prio: float
-            prio, current_node = frontier.pop()
-            # logger.debug(f"{prio=} {current_node=}")
+    path: List[int] = [goal]
+    while path[-1] != start:
+        path.append(parent[path[-1]])
+    path.reverse()
 
-            current_location: GridLocation = current_node.location
+    return path
 
-            current_pseudo_goal = GridLocation(col=current_location.col, row=goalline)  # same col, last row
 
-            if current_location.row == current_pseudo_goal.row and current_location.col == current_pseudo_goal.col:
-                ret.append(current_node)
+class AstarSolver:
+    @staticmethod
+    def search_all_available_exits(
+        grid: SquareGrid, start: GridLocation, max_exits: Optional[int] = None
+    ) -> List[GridNode]:
+        """
+        special case when exit is not defined, but exit is on the bottom most line
+        :param max_exits: stop searching once that many exits are found (the nearest ones) => None: find all
+        """
+        if start in grid.walls:
+            raise StartInWallException("invalid start location => start is in wall")
 
-            # check next
-            for neighbor in grid.allowed_neighbors(current_location):
-                neigh_pseudo_goal: GridLocation = GridLocation(col=neighbor.col, row=goalline)  # same col, last row
+        width: int = grid.dimension.width
+        height: int = grid.dimension.height
+        if not (0 <= start.col < width and 0 <= start.row < height):
+            raise StartOutOfBoundsException("invalid start location => start is out of bounds")
 
-                neigh_heuristic: int = grid.manhattan_heuristic(
-                    neighbor, neigh_pseudo_goal
-                )  # might cause over-estimation!!!
-                neigh_cost: float = current_node.cost + 1
+        goalline: int = height - 1
 
-                if neighbor not in explored or explored[neighbor] > neigh_cost:
-                    explored[neighbor] = neigh_cost  # found a faster path...
-                    frontier.put(
-                        neigh_cost,  # + heuristic not needed since __lt__ is defined in GridNode for PriorityQueue
-                        GridNode(location=neighbor, parent=current_node, cost=neigh_cost, heuristic=neigh_heuristic),
-                    )
+        order, parent = bfs_flat(
+            passable=grid.passable,
+            width=width,
+            height=height,
+            start=start.row * width + start.col,
+            stop_begin=goalline * width,
+            stop_end=goalline * width + width,
+            stop_after=max_exits or 0,
+        )
 
-        return ret
+        return exit_nodes_from_flat_bfs(order=order, parent=parent, width=width, goalline=goalline)
 
     @staticmethod
     def is_deadend(
         grid: SquareGrid, start_location: GridLocation, visited: Set[GridLocation], goal: GridLocation
     ) -> bool:
-        logger.debug("uncached...")
+        """
+        True if the goal can NOT be reached from start_location without stepping on one of the visited locations
+        => bidirectional BFS: always expands the smaller of both frontiers by one level and stops as soon as they meet
+        """
         # no sanity-checks done here!!!
-
-        # worklist
-        frontier: PriorityQueue[GridNode] = PriorityQueue()
-        frontier.put(
-            0.0,
-            GridNode(
-                location=start_location, parent=None, cost=0.0, heuristic=grid.manhattan_heuristic(start_location, goal)
-            ),
-        )
-
-        explored: Dict[GridLocation, float] = {}
-
-        # keep going while there is more to explore
-        while not frontier.is_empty():
-            current_node: GridNode
-            prio: float
-            prio, current_node = frontier.pop()
-
-            current_location: GridLocation = current_node.location
-            if current_location == goal:
-                return False
-
-            # check next
-            for neighbor in grid.allowed_neighbors(current_location):
-                if neighbor in visited:
-                    continue
-
-                neigh_heuristic: int = grid.manhattan_heuristic(neighbor, goal)
-                neigh_cost: float = current_node.cost + 1
-
-                if neighbor not in explored or explored[neighbor] > neigh_cost:
-                    explored[neighbor] = neigh_cost  # found a faster path...
-                    frontier.put(
-                        neigh_cost,
-                        # + heuristic not needed since __lt__ is defined in GridNode for PriorityQueue
-                        GridNode(location=neighbor, parent=current_node, cost=neigh_cost, heuristic=neigh_heuristic),
-                    )
+        if start_location == goal:
+            return False
+
+        if goal in visited or not grid.passable_and_in_bounds(goal):
+            return True
+
+        seen_fwd: Set[GridLocation] = {start_location}
+        seen_bwd: Set[GridLocation] = {goal}
+        frontier_fwd: List[GridLocation] = [start_location]
+        frontier_bwd: List[GridLocation] = [goal]
+
+        while frontier_fwd and frontier_bwd:
+            frontier: List[GridLocation]
+            seen: Set[GridLocation]
+            seen_other: Set[GridLocation]
+            if len(frontier_fwd) <= len(frontier_bwd):
+                frontier, seen, seen_other = frontier_fwd, seen_fwd, seen_bwd
+            else:
+                frontier, seen, seen_other = frontier_bwd, seen_bwd, seen_fwd
+
+            next_frontier: List[GridLocation] = []
+            for current_location in frontier:
+                for neighbor in grid.allowed_neighbors(current_location):
+                    if neighbor in seen or neighbor in visited:
+                        continue
+                    if neighbor in seen_other:
+                        return False
+
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+
+            if frontier is frontier_fwd:
+                frontier_fwd = next_frontier
+            else:
+                frontier_bwd = next_frontier
 
         return True
 
     @staticmethod
     def create_reachable_map_min(grid: SquareGrid, goal: GridLocation) -> Set[GridLocation]:
-        ret: Set[GridLocation] = set()
+        """
+        all locations from which the goal can be reached
+        => ONE (reverse) BFS starting at the goal instead of one search per location (the grid is undirected)
+        """
+        width: int = grid.dimension.width
+        reach: bytearray = AstarSolver.create_reachable_bits_min(grid=grid, goal=goal)
+
+        return {GridLocation(col=idx % width, row=idx // width) for idx, bit in enumerate(reach) if bit}
 
+    @staticmethod
+    def create_reachable_bits_min(grid: SquareGrid, goal: GridLocation) -> bytearray:
+        """
+        same as create_reachable_map_min, but flat row-major like grid.passable (1 == goal reachable from there)
+        """
         if goal in grid.walls:
             raise GoalInWallException("invalid goal location => start is in wall")
 
-        if goal.col < 0 or goal.row >= grid.dimension.width:
+        width: int = grid.dimension.width
+        height: int = grid.dimension.height
+        if not (0 <= goal.col < width and 0 <= goal.row < height):
             raise GoalOutOfBoundsException("invalid start location => start is in wall")
 
-        for row in range(0, grid.dimension.height):
-            for col in range(0, grid.dimension.width):
-                start: GridLocation = GridLocation(col=col, row=row)
-
-                if start in grid.walls or start.col < 0 or start.row >= grid.dimension.width:
-                    continue
+        order: List[int]
+        order, _ = bfs_flat(passable=grid.passable, width=width, height=height, start=goal.row * width + goal.col)
 
-                found: Optional[GridNode] = AstarSolver.search_shortest_path(grid=grid, start=start, goal=goal)
-                if found:
-                    ret.add(start)
+        reach: bytearray = bytearray(width * height)
+        for idx in order:
+            reach[idx] = 1
 
-        return ret
+        return reach
 
     @staticmethod
     def search_shortest_path(grid: SquareGrid, start: GridLocation, goal: GridLocation) -> Optional[GridNode]:
         if start in grid.walls:
             raise StartInWallException("invalid start location => start is in wall")
 
-        if start.col < 0 or start.row >= grid.dimension.width:
+        width: int = grid.dimension.width
+        height: int = grid.dimension.height
+        if not (0 <= start.col < width and 0 <= start.row < height):
             raise StartOutOfBoundsException("invalid start location => start is out of bounds")
 
-        # worklist
-        frontier: PriorityQueue[GridNode] = PriorityQueue()
-        frontier.put(
-            0.0, GridNode(location=start, parent=None, cost=0.0, heuristic=grid.manhattan_heuristic(start, goal))
-        )
-
-        explored: Dict[GridLocation, float] = {}
-
-        # keep going while there is more to explore
-        while not frontier.is_empty():
-            current_node: GridNode
-            prio: float
-            prio, current_node = frontier.pop()
+        if not (0 <= goal.col < width and 0 <= goal.row < height):
+            return None  # not reachable at all
 
-            current_location: GridLocation = current_node.location
-            if current_location.row == goal.row and current_location.col == goal.col:
-                return current_node
-
-            # check next
-            for neighbor in grid.allowed_neighbors(current_location):
-                neigh_heuristic: int = grid.manhattan_heuristic(neighbor, goal)
-                neigh_cost: float = current_node.cost + 1
-
-                if neighbor not in explored or explored[neighbor] > neigh_cost:
-                    explored[neighbor] = neigh_cost  # found a faster path...
-                    frontier.put(
-                        neigh_cost,
-                        # + heuristic not needed since __lt__ is defined in GridNode for PriorityQueue
-                        GridNode(location=neighbor, parent=current_node, cost=neigh_cost, heuristic=neigh_heuristic),
-                    )
+        path: Optional[List[int]] = _astar_flat(
+            passable=grid.passable,
+            width=width,
+            height=height,
+            start=start.row * width + start.col,
+            goal=goal.row * width + goal.col,
+        )
+        if path is None:
+            return None
 
-        return None
+        return nodes_from_flat_path(path, width=width, goal=goal)
 
     @staticmethod
-    def search_longest_path(grid: SquareGrid, start: GridLocation, goal: GridLocation) -> Optional[GridNode]:
+    def search_longest_path(
+        grid: SquareGrid, start: GridLocation, goal: GridLocation, max_iterations: Optional[int] = None
+    ) -> Optional[GridNode]:
         raise NotImplementedError()
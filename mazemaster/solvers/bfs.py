@@ -2,92 +2,91 @@ from __future__ import annotations
 
 from typing import List, Optional
 
+from mazemaster.solvers.flatgrid import (
+    bfs_flat,
+    exit_nodes_from_flat_bfs,
+    nodes_from_flat_path,
+)
 from mazemaster.solvers.gridmodels import (
     GridLocation,
     GridNode,
-    Queue,
     SquareGrid,
     StartInWallException,
     StartOutOfBoundsException,
 )
 
 
-from ordered_set import OrderedSet
-
-
 class BFSSolver:
+    """BFS on flat indices (row * width + col) internally => GridLocation/GridNode only at the api-boundary"""
+
     @staticmethod
-    def search_all_available_exits(grid: SquareGrid, start: GridLocation) -> List[GridNode]:
+    def search_all_available_exits(
+        grid: SquareGrid, start: GridLocation, max_exits: Optional[int] = None
+    ) -> List[GridNode]:
+        """:param max_exits: stop searching once that many exits are found (the nearest ones) => None: find all"""
         if start in grid.walls:
             raise StartInWallException("invalid start location => start is in wall")
 
-        if start.col < 0 or start.row >= grid.dimension.width:
+        width: int = grid.dimension.width
+        height: int = grid.dimension.height
+        if not (0 <= start.col < width and 0 <= start.row < height):
             raise StartOutOfBoundsException("invalid start location => start is out of bounds")
 
-        ret: List[GridNode] = []  # empty list returned -> none found
-
-        # worklist
-        frontier: Queue[GridNode] = Queue()
-        frontier.push(GridNode(location=start, parent=None))
-
-        explored: OrderedSet[GridLocation] = OrderedSet()
-
-        # keep going while there is more to explore
-        while not frontier.is_empty():
-            current_node: GridNode = frontier.pop()
-            current_location: GridLocation = current_node.location
-
-            if current_location.row == grid.dimension.height - 1:
-                ret.append(current_node)
-                # return ret  # to return only ONE exit at most
-                # continue
-
-            # check next
-            for neighbor in grid.allowed_neighbors(current_location):
-                if neighbor in explored:
-                    continue
+        goalline: int = height - 1
 
-                explored.add(neighbor)
+        order: List[int]
+        parent: List[int]
+        order, parent = bfs_flat(
+            passable=grid.passable,
+            width=width,
+            height=height,
+            start=start.row * width + start.col,
+            stop_begin=goalline * width,
+            stop_end=goalline * width + width,
+            stop_after=max_exits or 0,
+        )
 
-                frontier.push(GridNode(location=neighbor, parent=current_node))
-
-        return ret
+        return exit_nodes_from_flat_bfs(order=order, parent=parent, width=width, goalline=goalline)
 
     @staticmethod
     def search_shortest_path(grid: SquareGrid, start: GridLocation, goal: GridLocation) -> Optional[GridNode]:
         if start in grid.walls:
             raise StartInWallException("invalid start location => start is in wall")
 
-        if start.col < 0 or start.row >= grid.dimension.width:
+        width: int = grid.dimension.width
+        height: int = grid.dimension.height
+        if not (0 <= start.col < width and 0 <= start.row < height):
             raise StartOutOfBoundsException("invalid start location => start is out of bounds")
 
-        # worklist
-        frontier: Queue[GridNode] = Queue()
-        frontier.push(GridNode(location=start, parent=None))
-
-        explored: OrderedSet[GridLocation] = OrderedSet()
-
-        # keep going while there is more to explore
-        while not frontier.is_empty():
-            current_node: GridNode = frontier.pop()
-            current_location: GridLocation = current_node.location
-
-            if current_location.row == goal.row and current_location.col == goal.col:
-                return current_node
-                # return ret  # to return only ONE exit at most
-                # continue
-
-            # check next
-            for neighbor in grid.allowed_neighbors(current_location):
-                if neighbor in explored:
-                    continue
-
-                explored.add(neighbor)
-
-                frontier.push(GridNode(location=neighbor, parent=current_node))
-
-        return None
+        if not (0 <= goal.col < width and 0 <= goal.row < height):
+            return None  # not reachable at all
+
+        start_idx: int = start.row * width + start.col
+        goal_idx: int = goal.row * width + goal.col
+
+        order: List[int]
+        parent: List[int]
+        order, parent = bfs_flat(
+            passable=grid.passable,
+            width=width,
+            height=height,
+            start=start_idx,
+            stop_begin=goal_idx,
+            stop_end=goal_idx + 1,
+            stop_after=1,
+        )
+        if order[-1] != goal_idx:
+            return None
+
+        path: List[int] = [goal_idx]
+        while path[-1] != start_idx:
+            path.append(parent[path[-1]])
+        path.reverse()
+
+        return nodes_from_flat_path(path, width=width, goal=goal)
 
     @staticmethod
-    def search_longest_path(grid: SquareGrid, start: GridLocation, goal: GridLocation) -> Optional[GridNode]:
+    def search_longest_path(
+        grid: SquareGrid, start: GridLocation, goal: GridLocation, max_iterations: Optional[int] = None
+    ) -> Optional[GridNode]:
         raise NotImplementedError()
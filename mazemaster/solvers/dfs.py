@@ -1,24 +1,29 @@
 from __future__ import annotations
 
-from random import shuffle
-from typing import Dict, List, Optional, Set
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import permutations
+from random import choice
+from typing import Dict, List, Optional, Set, Tuple
 
 from loguru import logger
 
 from mazemaster.solvers.astar import AstarSolver
 from mazemaster.solvers.gridmodels import (
+    Dimension,
     GridLocation,
     GridNode,
-    MyStackFrame,
     SquareGrid,
-    Stack,
     StartInWallException,
     StartOutOfBoundsException,
     backtrack_node_to_start,
     get_steps_as_excel_list,
 )
+from mazemaster.utils.configuration import settings
 
-from ordered_set import OrderedSet
 from ratelimit import RateLimitException, limits
 
 
@@ -42,31 +47,113 @@ def debuglog_limit(*args) -> None:  # type: ignore
         pass
 
 
-def getmaxdict(sub_solved_maxpath: Dict[GridLocation, Dict[GridLocation, float]]) -> Dict[GridLocation, float]:
+# all orderings of the (at most 4) neighbors per neighbor-count => picking one is the same as shuffling the list
+_neighbor_permutations: List[List[Tuple[int, ...]]] = [list(permutations(range(n))) for n in range(5)]
+
+# opt-in (settings.DFS_BRANCH_WORKERS) and never on deta => at most 4 first steps off the start
+_branch_workers_max: int = (
+    0 if settings.deta_runtime_detected() else min(4, settings.DFS_BRANCH_WORKERS, os.cpu_count() or 1)
+)
+_branch_executor: Optional[ProcessPoolExecutor] = None
+
+
+def getmaxdict(sub_solved_maxpath: Dict[Tuple[GridLocation, GridLocation], float]) -> Dict[GridLocation, float]:
+    """max. solved cost per base_nodeloc over all its next_nodelocs"""
     ret: Dict[GridLocation, float] = {}
-    for k in sub_solved_maxpath.keys():
-        subdict: Optional[Dict[GridLocation, float]] = sub_solved_maxpath.get(k)
-        if subdict:
-            ret[k] = max([v for v in subdict.values()])
+    for (base_nodeloc, _), cost in sub_solved_maxpath.items():
+        if cost > ret.get(base_nodeloc, float("-inf")):
+            ret[base_nodeloc] = cost
 
     return ret
 
 
 def getmax(
-    sub_solved_maxpath: Dict[GridLocation, Dict[GridLocation, float]], base_node: GridLocation
+    sub_solved_maxpath: Dict[Tuple[GridLocation, GridLocation], float], base_node: GridLocation
 ) -> Optional[float]:
-    subdict: Optional[Dict[GridLocation, float]] = sub_solved_maxpath.get(base_node)
-    if subdict:
-        return max([v for v in subdict.values()])
+    costs: List[float] = [cost for (base_nodeloc, _), cost in sub_solved_maxpath.items() if base_nodeloc == base_node]
+    if costs:
+        return max(costs)
 
     return None
 
 
+def _get_branch_executor() -> Optional[ProcessPoolExecutor]:
+    """lazily instantiated process-pool for the DFS branches => None if not enabled, on deta-runtime or 1 core
+    spawned (not forked) workers => the caller might be a worker-thread of a multi-threaded process and a lock held
+    by another thread (loguru, db-connections) at fork-time would never be released in the child
+    """
+    global _branch_executor, _branch_workers_max
+
+    if _branch_executor is None and _branch_workers_max > 1:
+        try:
+            _branch_executor = ProcessPoolExecutor(_branch_workers_max, mp_context=multiprocessing.get_context("spawn"))
+            logger.debug(f"ProcessPoolExecutor successfully instantiated with max. {_branch_workers_max} processes")
+        except Exception as ex:
+            logger.exception("ProcessPoolExecutor could not be instantiated", exception=ex)
+            _branch_workers_max = 1  # do not try again
+
+    return _branch_executor
+
+
+def shutdown_branch_executor() -> None:
+    """to be called on shutdown => terminates the worker-processes of the DFS branches (if any were started)"""
+    global _branch_executor
+
+    if _branch_executor is not None:
+        _branch_executor.shutdown(wait=False, cancel_futures=True)
+        _branch_executor = None
+
+
+def _search_longest_branch(
+    dimension: Dimension,
+    walls: Set[GridLocation],
+    start: GridLocation,
+    first: GridLocation,
+    goal: GridLocation,
+    max_iterations: Optional[int] = None,
+) -> Tuple[Optional[List[GridLocation]], bool]:
+    """
+    worker-side: serial DFS for all paths starting with start -> first
+    => gets the plain walls (not the grid with its lazy tables) and returns the plain path (start -> goal), since a
+    GridNode-chain of a long path would be pickled recursively
+    :return: (path, capped) => see DFSSolver.search_longest_path_capped
+    """
+    grid: SquareGrid = SquareGrid(dimension=dimension, walls=walls)
+    startnode: GridNode = GridNode(
+        location=start, parent=None, cost=0.0, heuristic=grid.manhattan_heuristic(start, goal)
+    )
+    firstnode: GridNode = GridNode(
+        location=first, parent=startnode, cost=1.0, heuristic=grid.manhattan_heuristic(first, goal)
+    )
+
+    exitnode: Optional[GridNode]
+    capped: bool
+    exitnode, capped = DFSSolver._search_longest_path_from(
+        grid=grid,
+        start=start,
+        goal=goal,
+        rootnode=firstnode,
+        reach=AstarSolver.create_reachable_bits_min(grid=grid, goal=goal),
+        max_iterations=max_iterations,
+    )
+    if not exitnode:
+        return None, capped
+
+    path: List[GridLocation] = backtrack_node_to_start(exitnode)
+    path.reverse()
+
+    return path, capped
+
+
 class DFSSolver:
-    _debugprint: bool = True  # DFSSolver is WIP!
+    _debugprint: bool = False  # DFSSolver is WIP! => True: prints grid+path on every goal reached (slow!)
+    # below that many reachable cells feeding the worker-processes costs more than the split saves
+    _branch_min_reachable: int = 64
 
     @staticmethod
-    def search_all_available_exits(grid: SquareGrid, start: GridLocation) -> List[GridNode]:
+    def search_all_available_exits(
+        grid: SquareGrid, start: GridLocation, max_exits: Optional[int] = None
+    ) -> List[GridNode]:
         raise NotImplementedError()
 
     @staticmethod
@@ -74,8 +161,23 @@ class DFSSolver:
         raise NotImplementedError()
 
     @staticmethod
-    def search_longest_path(grid: SquareGrid, start: GridLocation, goal: GridLocation) -> Optional[GridNode]:
-        """brute-forcing with O(n*m) time/space-complexity (space probably more since i carry some stuff around ;-) )"""
+    def search_longest_path(
+        grid: SquareGrid, start: GridLocation, goal: GridLocation, max_iterations: Optional[int] = None
+    ) -> Optional[GridNode]:
+        """brute-forcing with O(n*m) time/space-complexity (space probably more since i carry some stuff around ;-) )
+        :param max_iterations => if set, the search stops after that many expanded nodes (split across the branches if
+        branched) and returns the longest path found so far (might be None or not the longest one)
+        """
+        return DFSSolver.search_longest_path_capped(grid=grid, start=start, goal=goal, max_iterations=max_iterations)[0]
+
+    @staticmethod
+    def search_longest_path_capped(
+        grid: SquareGrid, start: GridLocation, goal: GridLocation, max_iterations: Optional[int] = None
+    ) -> Tuple[Optional[GridNode], bool]:
+        """same as search_longest_path
+        :return: (exitnode, capped) => capped: the search stopped early (max_iterations hit) => exitnode is only the
+        longest path found until then
+        """
         if start in grid.walls:
             raise StartInWallException("invalid start location => start is in wall")
 
@@ -86,29 +188,135 @@ class DFSSolver:
             location=start, parent=None, cost=0.0, heuristic=grid.manhattan_heuristic(start, goal)
         )
 
+        # flat row-major like grid.passable => byte-read per neighbor instead of a set-lookup
+        reach: bytearray = AstarSolver.create_reachable_bits_min(grid=grid, goal=goal)
+
+        if start != goal and sum(reach) >= DFSSolver._branch_min_reachable:
+            executor: Optional[ProcessPoolExecutor] = _get_branch_executor()
+            if executor:
+                try:
+                    return DFSSolver._search_longest_path_branched(
+                        executor=executor,
+                        grid=grid,
+                        startnode=startnode,
+                        goal=goal,
+                        reach=reach,
+                        max_iterations=max_iterations,
+                    )
+                except BrokenProcessPool as bpp:
+                    logger.exception("process-pool broken => falling back to the serial search", exception=bpp)
+
+        return DFSSolver._search_longest_path_from(
+            grid=grid, start=start, goal=goal, rootnode=startnode, reach=reach, max_iterations=max_iterations
+        )
+
+    @staticmethod
+    def _search_longest_path_branched(
+        executor: ProcessPoolExecutor,
+        grid: SquareGrid,
+        startnode: GridNode,
+        goal: GridLocation,
+        reach: bytearray,
+        max_iterations: Optional[int] = None,
+    ) -> Tuple[Optional[GridNode], bool]:
+        """one worker-process per first step off the start => the subtrees below the start do not share any state"""
+        width: int = grid.dimension.width
+        start: GridLocation = startnode.location
+
+        firsts: List[GridLocation] = [
+            first for first in grid.allowed_neighbors(start) if reach[first.row * width + first.col]
+        ]
+
+        # the cap is meant for the whole search => split across the branches (the first ones get the remainder)
+        branch_iterations: List[Optional[int]] = [max_iterations] * len(firsts)
+        if max_iterations is not None and firsts:
+            per_branch, remainder = divmod(max_iterations, len(firsts))
+            branch_iterations = [per_branch + (1 if i < remainder else 0) for i in range(len(firsts))]
+
+        futures: List[Future[Tuple[Optional[List[GridLocation]], bool]]] = [
+            executor.submit(_search_longest_branch, grid.dimension, grid.walls, start, first, goal, iterations)
+            for first, iterations in zip(firsts, branch_iterations)
+        ]
+
+        overall_pathfound_longest: Optional[List[GridLocation]] = None
+        capped: bool = False
+        for future in futures:
+            path: Optional[List[GridLocation]]
+            branch_capped: bool
+            path, branch_capped = future.result()
+            capped = capped or branch_capped
+            if path and (not overall_pathfound_longest or len(overall_pathfound_longest) < len(path)):
+                overall_pathfound_longest = path
+
+        if not overall_pathfound_longest:
+            return None, capped
+
+        node: GridNode = startnode
+        for cost, location in enumerate(overall_pathfound_longest[1:], start=1):
+            node = GridNode(
+                location=location, parent=node, cost=float(cost), heuristic=grid.manhattan_heuristic(location, goal)
+            )
+
+        return node, capped
+
+    @staticmethod
+    def _search_longest_path_from(
+        grid: SquareGrid,
+        start: GridLocation,
+        goal: GridLocation,
+        rootnode: GridNode,
+        reach: bytearray,
+        max_iterations: Optional[int] = None,
+    ) -> Tuple[Optional[GridNode], bool]:
+        """the serial DFS below rootnode (the startnode itself or the first step of a branch) => (exitnode, capped)"""
         overall_pathfound_longest: Optional[GridNode] = None
+        capped: bool = False
+
+        # (base_node, stackdepth, visited_mask, visited_count) => plain tuples, no wrapper
+        # visited_mask: bit row * width + col set for every location on the path (excluding the root, same as
+        # GridNode.has_visited) => a child only ORs in its own bit instead of building a set from its parent's
+        frontier: deque[Tuple[GridNode, int, int, int]] = deque()
+
+        width: int = grid.dimension.width
+        reach_count: int = sum(reach)  # upper bound for the number of locations any path can still step on
 
-        frontier: Stack[MyStackFrame] = Stack()
+        # (base_nodeloc, next_nodeloc) -> float => flat, one lookup per step
+        sub_solved_maxpath: Dict[Tuple[GridLocation, GridLocation], float] = {}
 
-        reachablemap: Set[GridLocation] = AstarSolver.create_reachable_map_min(grid=grid, goal=goal)
+        goal_col: int = goal.col
+        goal_row: int = goal.row
 
-        sub_solved_maxpath: Dict[GridLocation, Dict[GridLocation, float]] = {}  # base_nodeloc -> next_nodeloc,float
+        root_mask: int = 0
+        node: GridNode = rootnode
+        while node.parent is not None:
+            root_mask |= 1 << (node.location.row * width + node.location.col)
+            node = node.parent
 
-        frontier.push(MyStackFrame(base_node=startnode, stackdepth=1))
+        frontier.append((rootnode, int(rootnode.cost) + 1, root_mask, rootnode.visited_count()))
         goalcount: int = 0
 
+        # loop-invariants as locals
+        frontier_pop = frontier.pop
+        frontier_append = frontier.append
+        sub_solved_maxpath_get = sub_solved_maxpath.get
+        allowed_neighbors = grid.allowed_neighbors
+        debugprint: bool = DFSSolver._debugprint
+        iterations_max: int = 100_000_000 if max_iterations is None else max_iterations
+
         whilecount: int = 0
         #############
-        while not frontier.is_empty():
+        while frontier:
             whilecount = whilecount + 1
-            stackframe: MyStackFrame = frontier.pop()
-            base_node: GridNode = stackframe.base_node
-            recurdepth: int = stackframe.stackdepth
+            base_node: GridNode
+            recurdepth: int
+            visited_mask: int
+            visited_count: int
+            base_node, recurdepth, visited_mask, visited_count = frontier_pop()
             current_location: GridLocation = base_node.location
 
-            steps: OrderedSet[GridLocation]
+            steps: List[GridLocation]
 
-            if DFSSolver._debugprint and whilecount % 250_000 == 0:
+            if debugprint and whilecount % 250_000 == 0:
                 logger.debug(
                     "(LOOPINFO) goalcount={} recurdepth={} len(sub_solved_maxpath)={} base_node.cost={} base_node={} len(frontier)={} whilecount={}".format(
                         goalcount,
@@ -122,24 +330,25 @@ class DFSSolver:
                 )
 
                 if overall_pathfound_longest:
-                    steps = OrderedSet(backtrack_node_to_start(overall_pathfound_longest))
+                    steps = backtrack_node_to_start(overall_pathfound_longest)
                     grid.print(
                         indent=8,
                         start=start,
                         end=overall_pathfound_longest.location,
                         steps=steps,
                         costs=getmaxdict(sub_solved_maxpath),
-                        reachablemap=reachablemap,
+                        reachablemap=AstarSolver.create_reachable_map_min(grid=grid, goal=goal),
                     )
 
                     print("WALLS: ", end="")
                     grid.print_walls_array()
                     print(f"CURRENT_LONGEST_PATH: {get_steps_as_excel_list(steps)}")
 
-            if recurdepth >= 1000 or whilecount >= 100_000_000:
-                logger.debug("BREAKING")
-                if overall_pathfound_longest:
-                    steps = OrderedSet(backtrack_node_to_start(overall_pathfound_longest))
+            if recurdepth >= 1000 or whilecount > iterations_max:
+                # hitting max_iterations is expected for capped searches => the grid only on demand
+                logger.debug(f"BREAKING after {whilecount - 1} iterations (recurdepth={recurdepth})")
+                if debugprint and overall_pathfound_longest:
+                    steps = backtrack_node_to_start(overall_pathfound_longest)
                     grid.print(
                         indent=8,
                         start=start,
@@ -148,6 +357,7 @@ class DFSSolver:
                         costs=getmaxdict(sub_solved_maxpath),
                     )
 
+                capped = True
                 break
 
             if goal == current_location:
@@ -164,18 +374,13 @@ class DFSSolver:
                     else:
                         parentlocation = backtrack_node.parent.location
 
-                    subdict: Optional[Dict[GridLocation, float]] = sub_solved_maxpath.get(parentlocation)
-                    if not subdict:
-                        subdict = {}
-                        sub_solved_maxpath[parentlocation] = subdict
-
-                    has_solution: Optional[float] = subdict.get(backtrack_node.location)
-                    if not has_solution or has_solution < backtrack_node.cost:
-                        subdict[backtrack_node.location] = backtrack_node.cost
+                    subkey: Tuple[GridLocation, GridLocation] = (parentlocation, backtrack_node.location)
+                    if sub_solved_maxpath_get(subkey, -1.0) < backtrack_node.cost:  # unsolved => -1.0 < any cost
+                        sub_solved_maxpath[subkey] = backtrack_node.cost
 
                     backtrack_node = backtrack_node.parent
 
-                if DFSSolver._debugprint:
+                if debugprint:
                     debuglog_limit(
                         "(GOALINFO) goalcount={} recurdepth={} len(sub_solved_maxpath)={} base_node.cost=={} base_node={} len(frontier)={} whilecount={}".format(
                             goalcount,
@@ -188,7 +393,7 @@ class DFSSolver:
                         )
                     )
 
-                    steps = OrderedSet(backtrack_node_to_start(overall_pathfound_longest))
+                    steps = backtrack_node_to_start(overall_pathfound_longest)
                     grid.print(
                         indent=8,
                         start=start,
@@ -203,27 +408,36 @@ class DFSSolver:
 
             # visited.add(current_location)
 
-            sorted_neighbors: List[GridLocation] = grid.get_sorted_neighbours_cached(
-                current_location=current_location, goal=goal
-            )
-            shuffled_neighbors: List[GridLocation] = sorted_neighbors.copy()
-            shuffle(shuffled_neighbors)
+            # same for all neighbors of this node
+            neigh_cost: float = base_node.cost + 1
 
-            for neighbor in shuffled_neighbors:
-                if base_node.has_visited(neighbor):
-                    # i was here already myself
+            # branch-and-bound: even stepping on every reachable location not visited yet (the root is not part of
+            # the visited-set => might be stepped on again) can not beat the longest path found so far
+            if (
+                overall_pathfound_longest
+                and neigh_cost + reach_count - visited_count - 1 <= overall_pathfound_longest.cost
+            ):
+                continue
+
+            # random order via a precomputed permutation => no sort, no copy, no shuffle of the (shared) neighbor-list
+            neighbors: List[GridLocation] = allowed_neighbors(current_location)
+
+            for neighbor_i in choice(_neighbor_permutations[len(neighbors)]):
+                neighbor: GridLocation = neighbors[neighbor_i]
+                neigh_idx: int = neighbor.row * width + neighbor.col
+                if not reach[neigh_idx]:
+                    # goal not reachable from there at all
                     continue
 
-                neigh_heuristic: int = grid.manhattan_heuristic(neighbor, goal)
-                neigh_cost: float = base_node.cost + 1
+                if visited_mask >> neigh_idx & 1:
+                    # i was here already myself
+                    continue
 
-                neigh_has_solution: Optional[float] = None
-                cur_subdict: Optional[Dict[GridLocation, float]] = sub_solved_maxpath.get(current_location)
-                if cur_subdict:
-                    neigh_has_solution = cur_subdict.get(neighbor)
+                neigh_heuristic: int = abs(neighbor.col - goal_col) + abs(neighbor.row - goal_row)  # manhattan
 
+                # unsolved => 0.0 which never beats neigh_cost (>= 1)
                 if (
-                    neigh_has_solution and neigh_has_solution > neigh_cost
+                    sub_solved_maxpath_get((current_location, neighbor), 0.0) > neigh_cost
                 ):  # this might be an optimization in favor of missing "some" paths
                     # skip this "too cheap" path
                     continue
@@ -232,8 +446,8 @@ class DFSSolver:
                     location=neighbor, parent=base_node, cost=neigh_cost, heuristic=neigh_heuristic
                 )
 
-                frontier.push(MyStackFrame(base_node=neighbor_node, stackdepth=recurdepth + 1))
+                frontier_append((neighbor_node, recurdepth + 1, visited_mask | 1 << neigh_idx, visited_count + 1))
 
         #############
 
-        return overall_pathfound_longest
+        return overall_pathfound_longest, capped
@@ -0,0 +1,101 @@
+"""flat-grid kernels shared by the solvers => locations as flat indices (row * width + col) on SquareGrid.passable,
+GridLocation/GridNode only at the api-boundary"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, List, Optional, Tuple, cast
+
+from mazemaster.solvers.gridmodels import GridLocation, GridNode
+
+
+def bfs_flat(
+    passable: bytearray,
+    width: int,
+    height: int,
+    start: int,
+    stop_begin: int = -1,
+    stop_end: int = -1,
+    stop_after: int = 0,
+) -> Tuple[List[int], List[int]]:
+    """
+    plain FIFO-BFS on flat indices => every edge costs 1, so discovery-order already is shortest-distance-order
+    :param stop_begin, stop_end, stop_after: stop as soon as stop_after indices of [stop_begin, stop_end) have been
+    visited (0: never) -> e.g. a whole row for exits or a single goal-index
+    :return: (visited flat indices in discovery-order, parent-array [-1 for start and not visited])
+    """
+    if stop_after <= 0:
+        stop_begin = stop_end = -1
+    stop_hits: int = 0
+
+    parent: List[int] = [-1] * len(passable)
+    seen: bytearray = bytearray(len(passable))
+    seen[start] = 1
+
+    order: List[int] = []
+    frontier: deque[int] = deque([start])
+
+    while frontier:
+        idx: int = frontier.popleft()
+        order.append(idx)
+
+        if stop_begin <= idx < stop_end:
+            stop_hits += 1
+            if stop_hits == stop_after:
+                break
+
+        row, col = divmod(idx, width)
+        for neighbor, in_bounds in (
+            (idx + 1, col + 1 < width),  # E
+            (idx - 1, col > 0),  # W
+            (idx - width, row > 0),  # N
+            (idx + width, row + 1 < height),  # S
+        ):
+            if in_bounds and passable[neighbor] and not seen[neighbor]:
+                seen[neighbor] = 1
+                parent[neighbor] = idx
+                frontier.append(neighbor)
+
+    return order, parent
+
+
+def nodes_from_flat_path(path: List[int], width: int, goal: GridLocation) -> GridNode:
+    """builds the GridNode-chain (start -> ... -> goal) for a flat path and returns the goal-node"""
+    node: Optional[GridNode] = None
+    for cost, idx in enumerate(path):
+        row, col = divmod(idx, width)
+        node = GridNode(
+            location=GridLocation(col=col, row=row),
+            parent=node,
+            cost=float(cost),
+            heuristic=float(abs(col - goal.col) + abs(row - goal.row)),
+        )
+    return cast(GridNode, node)
+
+
+def exit_nodes_from_flat_bfs(order: List[int], parent: List[int], width: int, goalline: int) -> List[GridNode]:
+    """
+    GridNodes only for the paths towards the exits (=visited indices on the goalline); shared prefixes share their nodes
+    => exits in discovery-order => nondecreasing number of steps (same as popping from a priority-queue)
+    """
+    nodes: Dict[int, GridNode] = {}
+
+    def _node(idx: int) -> GridNode:
+        chain: List[int] = []
+        while idx not in nodes and idx >= 0:
+            chain.append(idx)
+            idx = parent[idx]
+
+        node: Optional[GridNode] = nodes.get(idx)
+        for chain_idx in reversed(chain):
+            row: int = chain_idx // width
+            node = GridNode(
+                location=GridLocation(col=chain_idx % width, row=row),
+                parent=node,
+                cost=node.cost + 1 if node else 0.0,
+                heuristic=float(goalline - row),
+            )
+            nodes[chain_idx] = node
+        return cast(GridNode, node)
+
+    return [_node(idx) for idx in order if idx // width == goalline]
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 import collections
+import functools
+import heapq
 import math
 import re
 import string
-from functools import reduce
-from queue import PriorityQueue as PriorityQueueBackend
-from random import uniform
-from re import Match, Pattern
+from random import Random, random
+from re import Pattern
 from typing import (
+    Callable,
     Dict,
     Generic,
     Iterator,
@@ -16,20 +17,20 @@ from typing import (
     NamedTuple,
     Optional,
     Protocol,
+    Sequence,
     Set,
     Tuple,
     TypeVar,
 )
 
-import cachetools
 from loguru import logger
 
-from ordered_set import OrderedSet
-
 
 class SolverProtocol(Protocol):
     @staticmethod
-    def search_all_available_exits(grid: SquareGrid, start: GridLocation) -> List[GridNode]:
+    def search_all_available_exits(
+        grid: SquareGrid, start: GridLocation, max_exits: Optional[int] = None
+    ) -> List[GridNode]:
         ...
 
     @staticmethod
@@ -37,7 +38,9 @@ class SolverProtocol(Protocol):
         ...
 
     @staticmethod
-    def search_longest_path(grid: SquareGrid, start: GridLocation, goal: GridLocation) -> Optional[GridNode]:
+    def search_longest_path(
+        grid: SquareGrid, start: GridLocation, goal: GridLocation, max_iterations: Optional[int] = None
+    ) -> Optional[GridNode]:
         ...
 
 
@@ -79,6 +82,7 @@ def divmod_excel(n: int) -> Tuple[int, int]:
     return a, b
 
 
+@functools.lru_cache(maxsize=1024)  # C-level lookup => cachetools.cached would cost more than the divmod-loop itself
 def to_excel(num: int) -> str:
     chars = []
 
@@ -91,21 +95,36 @@ def to_excel(num: int) -> str:
 
 
 def from_excel(chars: str) -> int:
-    return reduce(lambda r, x: r * 26 + 1 + x, map(string.ascii_uppercase.index, chars), 0)
+    """1-based column number for the excel column chars (A -> 1, Z -> 26, AA -> 27); expects A-Z only"""
+    ret: int = 0
+    for b in chars.encode("ascii"):
+        ret = ret * 26 + b - 64  # 64 == ord("A") - 1
+    return ret
 
 
 _excel_pattern: str = r"^([A-Z]{1,})([1-9]\d*)$"
 _excel_pattern_compiled: Pattern = re.compile(_excel_pattern)
 
 
+_digits: str = "0123456789"
+
+
+def is_excel_coordinate(excelstr: str) -> bool:
+    """same as _excel_pattern_compiled.fullmatch, but via str-methods => no regex-machinery per wall"""
+    chars: str = excelstr.rstrip(_digits)
+    n: int = len(chars)
+    return 0 < n < len(excelstr) and excelstr[n] != "0" and chars.isascii() and chars.isalpha() and chars.isupper()
+
+
+@functools.lru_cache(maxsize=4096)
 def extracteinfo(excelstr: str) -> Tuple[int, int]:
-    """gets the row and col as zero-based int in a tuple"""
-    match: Optional[Match[str]] = _excel_pattern_compiled.match(excelstr)
-    if not match:
+    """gets the row and col as zero-based int in a tuple; memoized (same few coordinates parsed over and over)"""
+    if not is_excel_coordinate(excelstr):
         raise ValueError(f"INVALID: {excelstr}")
 
-    chargroup: str = match.groups()[0]
-    intgroup: str = match.groups()[1]
+    # split at the first digit => is_excel_coordinate already made sure it is [A-Z]+[1-9][0-9]*
+    chargroup: str = excelstr.rstrip(_digits)
+    intgroup: str = excelstr[len(chargroup) :]
 
     ret: Tuple[int, int] = from_excel(chargroup) - 1, int(intgroup) - 1  # -1 => to account for A1 means col=0,row=0
 
@@ -114,33 +133,31 @@ def extracteinfo(excelstr: str) -> Tuple[int, int]:
     return ret
 
 
-# @dataclass(slots=True)  # would be much faster!
-
-
 def glt(gltp: GridLocation) -> str:
     return f"{to_excel(gltp.col)}{gltp.row + 1}"
 
 
 class PriorityQueue(Generic[T]):
     def __init__(self, reverse: bool = False):
-        self._backend: PriorityQueueBackend = PriorityQueueBackend()  # priorityqueuebackend is thread-safe!!!
+        # plain heapq on a list => queue.PriorityQueue is thread-safe (lock per put/get), which the solvers don't need
+        self._backend: List[Tuple[float, T]] = []
         self._factor = -1 if reverse else 1
 
     def put(self, priority: float, item: T) -> None:
-        self._backend.put((self._factor * priority, item))
+        heapq.heappush(self._backend, (self._factor * priority, item))
 
     def pop(self) -> Tuple[float, T]:
         priority: float
         item: T
-        priority, item = self._backend.get()
+        priority, item = heapq.heappop(self._backend)
 
         return self._factor * priority, item
 
     def is_empty(self) -> bool:
-        return self._backend.empty()
+        return not self._backend
 
     def __len__(self) -> int:
-        return self._backend.qsize()
+        return len(self._backend)
 
     def __iter__(self) -> Iterator[Tuple[float, T]]:  # || Generator[YieldType, SendType, ReturnType]
         while not self.is_empty():
@@ -200,6 +217,9 @@ class Dimension(NamedTuple):
 
 
 class GridNode:
+    # slotted => no per-instance __dict__ (smaller and faster attribute-access); GridLocation already is a NamedTuple
+    __slots__ = ("location", "parent", "cost", "heuristic", "_visited")
+
     def __init__(
         self,
         location: GridLocation,
@@ -224,63 +244,169 @@ class GridNode:
         return f"GridNode(location=[col={self.location.col},row={self.location.row}], cost={self.cost} heuristic={self.heuristic})"
 
     def has_visited(self, location: GridLocation) -> bool:
-        if not self._visited:
-            self._visited = set()
-            nc: GridNode = self
-            while nc.parent:
-                self._visited.add(nc.location)
-                nc = nc.parent
+        visited: Optional[Set[GridLocation]] = self._visited
+        if visited is None:
+            visited = self._build_visited()
+
+        return location in visited
+
+    def visited_count(self) -> int:
+        """number of locations on the path up to (excluding) the root => same set as has_visited"""
+        visited: Optional[Set[GridLocation]] = self._visited
+        if visited is None:
+            visited = self._build_visited()
+
+        return len(visited)
 
-        return location in self._visited
+    def _build_visited(self) -> Set[GridLocation]:
+        """
+        locations on the path up to (excluding) the root => walks up only until the nearest ancestor that already has
+        its set built (in DFS usually the direct parent) and extends a copy of that one
+        """
+        chain: List[GridLocation] = []
+        nc: GridNode = self
+        while nc.parent is not None and nc._visited is None:
+            chain.append(nc.location)
+            nc = nc.parent
+
+        visited: Set[GridLocation] = set(nc._visited) if nc.parent is not None and nc._visited is not None else set()
+        visited.update(chain)
+        self._visited = visited
+
+        return visited
 
 
 class SquareGrid:
     def __init__(self, dimension: Dimension, walls: Optional[Set[GridLocation]] = None):
         self.dimension = dimension
-        self.walls: Set[GridLocation] = walls or set()
+        self._passable: Optional[bytearray] = None
+        self._neighbors_table: Optional[List[List[GridLocation]]] = None
+        self.walls = walls or set()
+
+    @property
+    def walls(self) -> Set[GridLocation]:
+        return self._walls
+
+    @walls.setter
+    def walls(self, walls: Set[GridLocation]) -> None:
+        self._walls: Set[GridLocation] = walls
+        self._passable = None  # re-built on next access
+        self._neighbors_table = None  # same
+
+    @property
+    def passable(self) -> bytearray:
+        """
+        flat row-major passable-map (1 == passable, index = row * width + col) => built once per walls-assignment
+        NOTE: in-place changes to the walls-set are not picked up -> assign a new set instead
+        """
+        if self._passable is None:
+            width: int = self.dimension.width
+            height: int = self.dimension.height
+            passable: bytearray = bytearray(b"\x01") * (width * height)
+            for wall in self._walls:
+                if 0 <= wall.col < width and 0 <= wall.row < height:
+                    passable[wall.row * width + wall.col] = 0
+            self._passable = passable
+
+        return self._passable
 
-    @cachetools.cached(cache=cachetools.TTLCache(maxsize=4096, ttl=600))
     def passable_and_in_bounds(self, loc: GridLocation) -> bool:
-        grid: SquareGrid = self
-        if loc in grid.walls:
-            return False
+        # not memoized: one indexed byte-load is cheaper than the cache-lookup (and does not go stale on new walls)
+        width: int = self.dimension.width
 
-        return 0 <= loc.col < grid.dimension.width and 0 <= loc.row < grid.dimension.height
+        return (
+            0 <= loc.col < width
+            and 0 <= loc.row < self.dimension.height
+            and self.passable[loc.row * width + loc.col] == 1
+        )
 
-    @cachetools.cached(cache=cachetools.TTLCache(maxsize=4096, ttl=600))
-    def allowed_neighbors(self, loc: GridLocation) -> List[GridLocation]:
-        """not being out of bound and not e.g. in a wall"""
-        grid: SquareGrid = self
-        neighbors = [
-            GridLocation(loc.col + 1, loc.row),
-            GridLocation(loc.col - 1, loc.row),
-            GridLocation(loc.col, loc.row - 1),
-            GridLocation(loc.col, loc.row + 1),
-        ]  # E W N S
+    @property
+    def neighbors_table(self) -> List[List[GridLocation]]:
+        """
+        allowed neighbors (E W N S) per location, flat row-major like passable => built once per walls-assignment
+        the lists are shared => do not modify them
+        """
+        if self._neighbors_table is None:
+            width: int = self.dimension.width
+            height: int = self.dimension.height
+            passable: bytearray = self.passable
+            # one GridLocation per location shared by all lists referencing it => no 4 allocations per location
+            locations: List[GridLocation] = [GridLocation(col, row) for row in range(height) for col in range(width)]
+
+            table: List[List[GridLocation]] = []
+            for row in range(height):
+                for col in range(width):
+                    idx: int = row * width + col
+                    neighbors: List[GridLocation] = []
+                    if col + 1 < width and passable[idx + 1]:  # E
+                        neighbors.append(locations[idx + 1])
+                    if col > 0 and passable[idx - 1]:  # W
+                        neighbors.append(locations[idx - 1])
+                    if row > 0 and passable[idx - width]:  # N
+                        neighbors.append(locations[idx - width])
+                    if row + 1 < height and passable[idx + width]:  # S
+                        neighbors.append(locations[idx + width])
+                    table.append(neighbors)
+            self._neighbors_table = table
+
+        return self._neighbors_table
 
+    def allowed_neighbors(self, loc: GridLocation) -> List[GridLocation]:
+        """not being out of bound and not e.g. in a wall => a lookup in the (shared) neighbors_table"""
+        width: int = self.dimension.width
+        height: int = self.dimension.height
+        col: int = loc.col
+        row: int = loc.row
+
+        col_in_bounds: bool = 0 <= col < width
+        row_in_bounds: bool = 0 <= row < height
+        if col_in_bounds and row_in_bounds:
+            return self.neighbors_table[row * width + col]
+
+        # off-grid location => only the single neighbor stepping back onto the grid could be valid
+        # => checked per direction, so no GridLocation is built for the off-grid candidates
+        passable: bytearray = self.passable
         ret: List[GridLocation] = []
-        for k in neighbors:
-            if grid.passable_and_in_bounds(k):
-                ret.append(k)
-
+        if row_in_bounds:
+            if 0 <= col + 1 < width and passable[row * width + col + 1]:  # E
+                ret.append(GridLocation(col + 1, row))
+            if 0 <= col - 1 < width and passable[row * width + col - 1]:  # W
+                ret.append(GridLocation(col - 1, row))
+        if col_in_bounds:
+            if 0 <= row - 1 < height and passable[(row - 1) * width + col]:  # N
+                ret.append(GridLocation(col, row - 1))
+            if 0 <= row + 1 < height and passable[(row + 1) * width + col]:  # S
+                ret.append(GridLocation(col, row + 1))
         return ret
 
-    @cachetools.cached(cache=cachetools.TTLCache(maxsize=4096, ttl=600))
     def get_sorted_neighbours_cached(self, goal: GridLocation, current_location: GridLocation) -> List[GridLocation]:
-        # logger.debug(f"NOT IN CACHE: {current_location=}, {goal=}")
-
-        grid: SquareGrid = self
-
-        sorted_neighbors: List[GridLocation] = sorted(
-            grid.allowed_neighbors(current_location), key=lambda x: grid.manhattan_heuristic(x, goal), reverse=True
-        )
-        return sorted_neighbors
+        """
+        allowed neighbors sorted by descending distance to the goal (ties in E W N S order)
+        => every step changes the distance by exactly +-1, so the order follows from the direction towards the goal:
+        first all steps leading away from the goal, then all steps leading towards it; no sort, no memo needed anymore
+        """
+        dx: int = goal.col - current_location.col
+        dy: int = goal.row - current_location.row
+
+        away: List[GridLocation] = []
+        towards: List[GridLocation] = []
+        for neighbor in self.allowed_neighbors(current_location):
+            is_away: bool
+            if neighbor.col > current_location.col:  # E
+                is_away = dx <= 0
+            elif neighbor.col < current_location.col:  # W
+                is_away = dx >= 0
+            elif neighbor.row < current_location.row:  # N
+                is_away = dy >= 0
+            else:  # S
+                is_away = dy <= 0
+            (away if is_away else towards).append(neighbor)
+
+        return away + towards
 
-    @cachetools.cached(cache=cachetools.TTLCache(maxsize=4096, ttl=600))
     def manhattan_heuristic(self, a: GridLocation, b: GridLocation) -> int:
-        (x1, y1) = a
-        (x2, y2) = b
-        return abs(x1 - x2) + abs(y1 - y2)
+        # not memoized: building+hashing the cache-key (incl. the grid) costs more than the two subtractions
+        return abs(a.col - b.col) + abs(a.row - b.row)
 
     @staticmethod
     def from_walls_onezero_array(dimension: Dimension, walldatastr: List[str]) -> SquareGrid:
@@ -298,32 +424,69 @@ class SquareGrid:
         return ret
 
     @staticmethod
-    def from_excel_array(dimension: Dimension, walldata: List[str]) -> SquareGrid:
-        walls: Set[GridLocation] = set([GridLocation(*extracteinfo(w)) for w in walldata])
+    def from_excel_array(dimension: Dimension, walldata: Sequence[str]) -> SquareGrid:
+        """
+        walls and the flat passable-map in one pass over the excel-coordinates
+        => the column-letters repeat (at most width different ones), hence parsed once per column only
+        """
+        width: int = dimension.width
+        height: int = dimension.height
+        passable: bytearray = bytearray(b"\x01") * (width * height)
+        colnums: Dict[str, int] = {}
+        walls: Set[GridLocation] = set()
+
+        for w in walldata:
+            if not is_excel_coordinate(w):
+                raise ValueError(f"INVALID: {w}")
+
+            chars: str = w.rstrip(_digits)
+            col: Optional[int] = colnums.get(chars)
+            if col is None:
+                col = colnums[chars] = from_excel(chars) - 1
+            row: int = int(w[len(chars) :]) - 1
+
+            walls.add(GridLocation(col=col, row=row))
+            if col < width and row < height:
+                passable[row * width + col] = 0
 
         ret: SquareGrid = SquareGrid(dimension)
         ret.walls = walls
+        ret._passable = passable  # same as built lazily from the walls
 
         return ret
 
     @staticmethod
     def create_random_grid(
-        dimension: Dimension, obstacle_perc: float, startpos: GridLocation, endpos: GridLocation
+        dimension: Dimension,
+        obstacle_perc: float,
+        startpos: GridLocation,
+        endpos: GridLocation,
+        rng: Optional[Random] = None,
     ) -> SquareGrid:
-        walls: Set[GridLocation] = set()
-
-        for row in range(dimension.height):
-            for column in range(dimension.width):
-                gl: GridLocation = GridLocation(row=row, col=column)
-                if gl == startpos or gl == endpos:
-                    continue
-
-                if uniform(0, 1.0) < obstacle_perc:
-                    walls.add(gl)
-
-                # special-case: add line at the bottom aside exit
-                if row == dimension.height - 1:
-                    walls.add(gl)
+        """:param rng: own generator (e.g. seeded => reproducible grids); default: the module-level one of random"""
+        _random: Callable[[], float] = rng.random if rng is not None else random
+        width: int = dimension.width
+        height: int = dimension.height
+
+        def _idx(loc: GridLocation) -> int:
+            return loc.row * width + loc.col if 0 <= loc.col < width and 0 <= loc.row < height else -1
+
+        start_idx: int = _idx(startpos)
+        end_idx: int = _idx(endpos)
+
+        # one draw per cell (except start+end) in row-major order => same random-stream as before, in one comprehension
+        walls: Set[GridLocation] = {
+            GridLocation(col=idx % width, row=idx // width)
+            for idx in range(width * height)
+            if idx != start_idx and idx != end_idx and _random() < obstacle_perc
+        }
+
+        # special-case: add line at the bottom aside exit
+        walls.update(
+            GridLocation(col=column, row=height - 1)
+            for column in range(width)
+            if (height - 1) * width + column not in (start_idx, end_idx)
+        )
 
         rgrid: SquareGrid = SquareGrid(dimension=dimension, walls=walls)
 
@@ -334,7 +497,7 @@ class SquareGrid:
         indent: int = 0,
         start: Optional[GridLocation] = None,
         end: Optional[GridLocation] = None,
-        steps: Optional[OrderedSet[GridLocation]] = None,
+        steps: Optional[Sequence[GridLocation]] = None,
         costs: Optional[Dict[GridLocation, float]] = None,
         reachablemap: Optional[Set[GridLocation]] = None,
     ) -> None:
@@ -352,8 +515,12 @@ class SquareGrid:
         if costs:
             # assumes int-costs!!!
             columnwidth = max(columnwidth, max([int(math.log10(round(v))) + 1 for v in costs.values() if v > 0]) + 3)
+        # step-number per location built once => no index()-search per printed location
+        stepnums: Dict[GridLocation, int] = {}
         if steps:
             columnwidth = max(columnwidth, round(math.log10(len(steps))) + 3)
+            for i, step in enumerate(steps):
+                stepnums.setdefault(step, len(steps) - i)
 
         # print(f"{columnwidth=} {linecolumnwidth=}")
         w: str = "@"
@@ -389,8 +556,8 @@ class SquareGrid:
                 elif costs and mepoint in costs:
                     mc: str = f"{costs[mepoint]:.1f}"
                     print(f"{Back.BLUE}{mc:^{columnwidth}}", end=Back.RESET)
-                elif steps and mepoint in steps:
-                    stepnum: str = f"[{len(steps)-steps.index(mepoint)}]"
+                elif mepoint in stepnums:
+                    stepnum: str = f"[{stepnums[mepoint]}]"
                     print(f"{Back.BLUE}{stepnum:^{columnwidth}}", end=Back.RESET)
                 else:
                     print(f"{e:^{columnwidth}}", end="")
@@ -401,16 +568,12 @@ class SquareGrid:
         print("[" + ", ".join([f'"{to_excel(w.col)}{w.row + 1}"' for w in self.walls]) + "]")
 
 
-def get_steps_as_excel_list(steps: OrderedSet[GridLocation]) -> List[str]:
-    ret: List[str] = []
-
-    for i in range(0, len(steps)):
-        s: GridLocation = steps[len(steps) - i - 1]
-        ret.append(f"{to_excel(s.col)}{s.row + 1}")
-    return ret
+def get_steps_as_excel_list(steps: Sequence[GridLocation]) -> List[str]:
+    """steps as backtracked (goal -> start) => excel-coordinates from start -> goal"""
+    return [f"{to_excel(s.col)}{s.row + 1}" for s in reversed(steps)]
 
 
-def get_steps_as_excel(steps: OrderedSet[GridLocation]) -> str:
+def get_steps_as_excel(steps: Sequence[GridLocation]) -> str:
     ret = ""
 
     for i, s in enumerate(get_steps_as_excel_list(steps)):
@@ -420,12 +583,12 @@ def get_steps_as_excel(steps: OrderedSet[GridLocation]) -> str:
     return ret
 
 
-def backtrack_node_to_start(node: GridNode) -> Iterator[GridLocation]:
-    ret: Queue[GridLocation] = Queue()
-    ret.push(node.location)  # also include exit-node
+def backtrack_node_to_start(node: GridNode) -> List[GridLocation]:
+    """locations from the node back to the start => plain list: no queue to drain and can be iterated more than once"""
+    ret: List[GridLocation] = [node.location]  # also include exit-node
 
     while node.parent is not None:
         node = node.parent
-        ret.push(node.location)
+        ret.append(node.location)
 
-    return iter(ret)
+    return ret
@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import math
 from base64 import b64encode
@@ -63,11 +64,13 @@ responses_404: dict = {404: {"class": HTTPException}}
 responses_429: dict = {429: {"class": HTTPException}}
 responses_422: dict = {422: {"class": HTTPException}}
 responses_409: dict = {409: {"class": HTTPException}}
+responses_202: dict = {202: {"description": "solution is being processed => poll again"}}
 responses_401_422: dict = responses_401 | responses_422
 responses_401_403: dict = responses_401 | responses_403
 responses_401_404: dict = responses_401 | responses_404
 responses_401_403_404: dict = responses_401 | responses_403 | responses_404
 responses_401_403_404_409: dict = responses_401 | responses_403 | responses_404 | responses_409
+responses_202_401_403_404_409: dict = responses_202 | responses_401_403_404_409
 responses_401_403_404_409_422: dict = responses_401 | responses_403 | responses_404 | responses_409 | responses_422
 responses_403_429: dict = responses_403 | responses_429
 
@@ -90,6 +93,8 @@ class UnScopedOAuth2PasswordRequestForm(OAuth2PasswordRequestForm):
 
 _pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_jwt_key_designation: KeyDesignation = KeyDesignation[settings.JWT_ALGORITHM]  # resolved once, not per token
+
 
 _cache: dict[str, TTLCache] = {}  # str, dict[str, str]]
 _cache_lock = Lock()
@@ -186,20 +191,33 @@ async def retrieve_all_valid_RS256_keys() -> RS256JWKSet:
     return RS256JWKSet(keys=key_list)
 
 
+# short ttl => a rotated/deleted key stops verifying tokens in every worker within a minute
+_key_cache: TTLCache = TTLCache(maxsize=16, ttl=60)  # (keyid, keydesignation) -> KeyDictEntry
+
+
 async def retrieve_key(keyid: str, keydesignation: KeyDesignation = KeyDesignation.HS256) -> Optional[KeyDictEntry]:
     """
     not entirely correct to name it keytype, hence named it "keydesignation"
     HS256 (HMAC with SHA-256)
     RS256 (RSA Signature with SHA-256)
+
+    found keys are cached (ttl 1min) => no db-lookup per token signed/verified; keys not found are not cached
     """
+    cachekey: Tuple[str, KeyDesignation] = (keyid, keydesignation)
+    kde: Optional[KeyDictEntry] = _key_cache.get(cachekey)
+    if kde is not None:
+        return kde
 
     keydict: Optional[dict] = await get_key_by_id_and_designation(
         keyid, keydesignation.value
     )  # lookup per Literal-alg!
     if keydict is None:
-        return None
+        return None  # not cached -> a key created later on is found then
 
-    return KeyDictEntry(**keydict)
+    kde = KeyDictEntry(**keydict)
+    _key_cache[cachekey] = kde
+
+    return kde
 
 
 def get_hash_of_str(input: str) -> str:
@@ -232,6 +250,16 @@ def create_password_hash(password: str) -> str:
     return _pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """same as verify_password, but run in the default executor to not block the event-loop with bcrypt"""
+    return await asyncio.get_running_loop().run_in_executor(None, verify_password, plain_password, hashed_password)
+
+
+async def create_password_hash_async(password: str) -> str:
+    """same as create_password_hash, but run in the default executor to not block the event-loop with bcrypt"""
+    return await asyncio.get_running_loop().run_in_executor(None, create_password_hash, password)
+
+
 async def check_if_user_has_session(userid: UUID) -> bool:
     """
     checks if for the given userid there are valid access-tokens issued (and not deleted since then)
@@ -263,7 +291,7 @@ async def create_refresh_token(userid: UUID, request_url_base: str) -> Tuple[str
     return await create_token_longform(
         _payload,
         keyid=settings.JWT_KEYID,
-        key_designation=KeyDesignation[settings.JWT_ALGORITHM],
+        key_designation=_jwt_key_designation,
         jwt_token_expire_minutes=settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES,
         request_url_base=request_url_base,
     )
@@ -277,7 +305,7 @@ async def create_access_token(userid: UUID, request_url_base: str) -> Tuple[str,
     return await create_token_longform(
         _payload,
         keyid=settings.JWT_KEYID,
-        key_designation=KeyDesignation[settings.JWT_ALGORITHM],
+        key_designation=_jwt_key_designation,
         jwt_token_expire_minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES,
         request_url_base=request_url_base,
     )
@@ -31,6 +31,8 @@ class Settings(BaseSettings):
     PASSWORD_PATTERN: str = Field(default=r"^(?=.*?[A-Z])(?=.*?[a-z])(?=.*?[0-9])(?=.*?[#?!@$%^&*-]).*$")
     USERNAME_PATTERN: str = Field(default=r"^(?=.*?[A-Z])(?=.*?[a-z]|[-]).*$")
     GRIDSIZE_PATTERN: str = Field(default=r"^([1-9]\d*)x(?=[2-9]|[1-9][0-9])(\d*)$")
+    # > 1 => longest-path DFS splits into (at most 4) worker-processes; off by default => not for the server-process
+    DFS_BRANCH_WORKERS: int = Field(default=0)
 
     def deta_runtime_detected(self) -> bool:
         print(f"{self.DETA_RUNTIME=}")
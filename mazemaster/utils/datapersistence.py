@@ -1,19 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
-from typing import List, Literal, Optional, Set, Tuple, Union
+from typing import AsyncIterator, List, Literal, Optional, Set, Tuple, Union
 from uuid import UUID
 
+from cachetools import TTLCache
 from loguru import logger
 
 from mazemaster.utils.detadbwrapper import (
     AvailableDBS,
     create_new_entry,
+    delete_entries,
     delete_entry,
     get_all_data,
+    get_count_by_fields,
     get_data_by_field,
     get_data_by_fields,
     get_data_by_key,
+    increment_counter,
+    insert_if_absent,
+    iter_all_data,
+    put_entries,
     update_data,
 )
 
@@ -22,27 +30,68 @@ import pytz
 
 _tzberlin: datetime.tzinfo = pytz.timezone("Europe/Berlin")
 
+# key-ids served from here for a short while instead of one db-round-trip per lookup
+# only found entries are cached (a key created later on is found then)
+# the single keys are not cached here => auth.retrieve_key caches them already
+# users are not cached at all => login and token-verification have to see a deleted user/changed password at once in
+# every worker
+_key_cache: TTLCache = TTLCache(maxsize=64, ttl=300)  # ("ids", designation) -> keyids
+
 """semantic layer for mangling data from 'here' to deta-base and vice versa => there is no orm for deta amd anyway, 
 a semantic layer might be beneficial"""
 
 
-async def check_valid_tokens_access_token_or_refresh_token(userid: UUID) -> Tuple[int, int]:
-    valid_access_tokens_found: int = 0
-    valid_refresh_tokens_found: int = 0
+async def backfill_token_expires_at_ts() -> int:
+    """
+    tokens issued before expires_at_ts was stored are not counted by check_valid_tokens_access_token_or_refresh_token
+    (deta compares expires_at_ts) => computed once from expires_at; a marker in counters skips the scan afterwards
+    :return: number of tokens backfilled
+    """
+    markerkey: str = "migration_tokens_expires_at_ts"
+    if await get_data_by_key(db=AvailableDBS.counters, keyvalue=markerkey):
+        return 0
+
+    backfilled: int = 0
+    async for tokendata in iter_all_data(db=AvailableDBS.tokens_issued):
+        if tokendata.get("expires_at_ts") is None:
+            await update_data(
+                db=AvailableDBS.tokens_issued,
+                key=tokendata["key"],
+                partial_data={"expires_at_ts": datetime.datetime.fromisoformat(tokendata["expires_at"]).timestamp()},
+            )
+            backfilled += 1
 
-    now: datetime.datetime = datetime.datetime.now(tz=_tzberlin)
+    # several workers might scan concurrently on the very first start => harmless, same values written
+    await insert_if_absent(db=AvailableDBS.counters, key=markerkey, data={"backfilled": backfilled})
 
-    deltokenids: List[UUID] = []
+    logger.info(f"{backfilled=} tokens without expires_at_ts")
+    return backfilled
 
-    for tokendata in await get_data_by_field(db=AvailableDBS.tokens_issued, fieldname="userid", fieldvalue=userid):
-        expires_at: datetime.datetime = datetime.datetime.fromisoformat(tokendata["expires_at"])
-        is_refresh_token: bool = tokendata["refresh_token_id"] is None
-        is_valid: bool = expires_at.timestamp() > now.timestamp()
-        if is_valid:
-            valid_access_tokens_found += 0 if is_refresh_token else 1
-            valid_refresh_tokens_found += 1 if is_refresh_token else 0
 
-        logger.debug(f"{userid=} {type(expires_at)=} {expires_at=} {is_valid=} {is_refresh_token=}")
+async def check_valid_tokens_access_token_or_refresh_token(userid: UUID) -> Tuple[int, int]:
+    """counted by deta on expires_at_ts => no token-rows transferred, no fromisoformat per token"""
+    now_ts: float = datetime.datetime.now(tz=_tzberlin).timestamp()
+
+    valid_tokens_found: int
+    valid_refresh_tokens_found: int
+    valid_tokens_found, valid_refresh_tokens_found = await asyncio.gather(
+        get_count_by_fields(
+            db=AvailableDBS.tokens_issued,
+            fieldnames=["userid"],
+            fieldvalues=[userid],
+            greater_than={"expires_at_ts": now_ts},
+        ),
+        get_count_by_fields(
+            db=AvailableDBS.tokens_issued,
+            fieldnames=["userid", "refresh_token_id"],
+            fieldvalues=[userid, None],  # refresh-tokens do not refer to a refresh-token themselves
+            greater_than={"expires_at_ts": now_ts},
+        ),
+    )
+
+    valid_access_tokens_found: int = valid_tokens_found - valid_refresh_tokens_found
+
+    logger.debug(f"{userid=} {valid_access_tokens_found=} {valid_refresh_tokens_found=}")
     return (valid_access_tokens_found, valid_refresh_tokens_found)
 
 
@@ -61,6 +110,7 @@ async def save_issued_token(
         "userid": userid,
         "keyid": keyid,
         "expires_at": expires_at,
+        "expires_at_ts": expires_at.timestamp(),  # numeric => comparable by deta in queries
         "issued_at": issued_at,
     }
     await create_new_entry(
@@ -72,40 +122,37 @@ async def save_issued_token(
 
 
 async def get_refresh_tokenid_from_access_tokenid(userid: UUID, access_tokenid_used: UUID) -> Optional[UUID]:
-    for tokendata in await get_data_by_fields(
-        db=AvailableDBS.tokens_issued,
-        fieldnames=["userid", "id"],
-        fieldvalues=[userid, access_tokenid_used],
-    ):  # könnte hier auch als query machen!
-        return tokendata["refresh_token_id"]
+    # id == key => direct get instead of a query; the userid is checked here
+    for tokendata in await get_data_by_key(db=AvailableDBS.tokens_issued, keyvalue=access_tokenid_used):
+        if tokendata["userid"] == str(userid):
+            return tokendata["refresh_token_id"]
 
     return None
 
 
 ### the following seems horribly redundant -> but when using a "real" db, this will only be one line each...
 async def _clean_tokens_by_list(deltokenids: List[Tuple[UUID, str]]) -> None:
-    for tokenid, expires_at in deltokenids:
-        logger.debug(f"deleting token: {tokenid=}")
+    if not deltokenids:
+        return
 
-        newentry: dict[str, Union[str, UUID]] = {"id": tokenid, "expires_at": expires_at}
-        await create_new_entry(
+    logger.debug(f"deleting tokens: {deltokenids=}")
+
+    # independent of each other => both round-trips overlap
+    await asyncio.gather(
+        put_entries(
             db=AvailableDBS.tokens_deleted,
-            key=tokenid,
-            data=newentry,
-            # expire_at=expires_at.timestamp()  # :-))
-        )
-        await delete_entry(db=AvailableDBS.tokens_issued, key=tokenid)
+            entries=[(tokenid, {"id": tokenid, "expires_at": expires_at}) for tokenid, expires_at in deltokenids],
+        ),
+        delete_entries(db=AvailableDBS.tokens_issued, keys=[tokenid for tokenid, _ in deltokenids]),
+    )
 
 
 async def clean_tokens_by_access_tokenid(userid: UUID, access_tokenid_used: UUID) -> None:
     deltokenids: List[Tuple[UUID, str]] = []
-    for tokendata in await get_data_by_fields(
-        db=AvailableDBS.tokens_issued,
-        fieldnames=["userid", "id"],
-        fieldvalues=[userid, access_tokenid_used],
-    ):  # könnte hier auch als query machen!:
-
-        deltokenids.append((UUID(tokendata["id"]), tokendata["expires_at"]))
+    # id == key => direct get instead of a query; the userid is checked here
+    for tokendata in await get_data_by_key(db=AvailableDBS.tokens_issued, keyvalue=access_tokenid_used):
+        if tokendata["userid"] == str(userid):
+            deltokenids.append((UUID(tokendata["id"]), tokendata["expires_at"]))
     await _clean_tokens_by_list(deltokenids)
 
 
@@ -153,10 +200,19 @@ async def get_valid_RS256_pubkey_pems_and_keyids() -> List[Tuple[str, str]]:
 
 
 async def get_key_ids_by_designation(keydesignation: Literal["HS256", "RS256"] = "HS256") -> List[str]:
-    ret: List[str] = []
+    cached: Optional[List[str]] = _key_cache.get(("ids", keydesignation))
+    if cached:
+        return list(cached)
+
+    ret: List[str] = [
+        keydata["id"]
+        for keydata in await get_data_by_field(
+            db=AvailableDBS.keys, fieldname="keydesignation", fieldvalue=keydesignation
+        )
+    ]
 
-    for keydata in await get_data_by_field(db=AvailableDBS.keys, fieldname="keydesignation", fieldvalue=keydesignation):
-        ret.append(keydata["id"])
+    if ret:
+        _key_cache[("ids", keydesignation)] = list(ret)
 
     return ret
 
@@ -171,17 +227,26 @@ async def get_key_by_id_and_designation(
     keyid: str, keydesignation: Literal["HS256", "RS256"] = "HS256"
 ) -> Optional[dict]:
     keydata: dict
-    for keydata in await get_data_by_fields(
-        db=AvailableDBS.keys, fieldnames=["keydesignation", "id"], fieldvalues=[keydesignation, keyid]
-    ):
-        return keydata
+    # id == key => direct get instead of a query; the designation is checked here
+    for keydata in await get_data_by_key(db=AvailableDBS.keys, keyvalue=keyid):
+        if keydata["keydesignation"] == keydesignation:
+            return keydata
 
     return None
 
 
 async def get_user_from_db_by_username(username: str) -> Optional[dict]:
-    userdata: dict
-    for userdata in await get_data_by_field(db=AvailableDBS.users, fieldname="username", fieldvalue=username):
+    # username -> userid lookup-key => two direct gets instead of a scan over all users
+    # the index-entry might be missing (user created before the index) or stale (user deleted) => then the user is
+    # looked up the long way and the index-entry is (re-)written
+    userdata: Optional[dict]
+    for indexdata in await get_data_by_key(db=AvailableDBS.users_by_username, keyvalue=username):
+        userdata = await get_user_from_db_by_id(UUID(indexdata["userid"]))
+        if userdata and userdata["username"] == username:
+            return userdata
+
+    for userdata in await get_data_by_field(db=AvailableDBS.users, fieldname="username", fieldvalue=username, limit=1):
+        await put_entries(db=AvailableDBS.users_by_username, entries=[(username, {"userid": userdata["id"]})])
         return userdata
 
     return None
@@ -195,29 +260,72 @@ async def get_user_from_db_by_id(userid: UUID) -> Optional[dict]:
     return None
 
 
-async def get_maze_from_db_by_userid_and_hash(userid: UUID, hash: str) -> Optional[dict]:
-    mazedata: dict
+def _maze_index_entry(mazedata: dict) -> dict:
+    """lookup-entry => the hash as well, so the solution (keyed by maze-hash) can be fetched alongside the maze"""
+    return {"mazeid": mazedata["id"], "hash": mazedata["hash"]}
+
+
+async def _get_maze_from_db_by_index(
+    indexdb: AvailableDBS, indexkey: str, fieldname: str, fieldvalue: Union[str, int], userid: UUID
+) -> Optional[dict]:
+    """
+    maze via its lookup-key => two direct gets instead of a scan over all mazes
+    the index-entry might be missing (maze created before the index) or stale (maze deleted) => then the maze is
+    looked up the long way and the index-entry is (re-)written; entries written before they carried the maze-hash are
+    rewritten as well
+    """
+    for indexdata in await get_data_by_key(db=indexdb, keyvalue=indexkey):
+        mazedata: Optional[dict] = await get_maze_from_db_by_id(UUID(indexdata["mazeid"]))
+        if mazedata and mazedata["owner_id"] == str(userid) and mazedata[fieldname] == fieldvalue:
+            if indexdata.get("hash") != mazedata["hash"]:
+                await put_entries(db=indexdb, entries=[(indexkey, _maze_index_entry(mazedata))])
+            return mazedata
+
     for mazedata in await get_data_by_fields(
-        db=AvailableDBS.mazes, fieldnames=["owner_id", "hash"], fieldvalues=[userid, hash]
+        db=AvailableDBS.mazes, fieldnames=["owner_id", fieldname], fieldvalues=[userid, fieldvalue], limit=1
     ):
+        await put_entries(db=indexdb, entries=[(indexkey, _maze_index_entry(mazedata))])
         return mazedata
 
     return None
 
 
+async def get_maze_from_db_by_userid_and_hash(userid: UUID, hash: str) -> Optional[dict]:
+    return await _get_maze_from_db_by_index(
+        indexdb=AvailableDBS.mazes_by_owner_hash,
+        indexkey=f"{userid}:{hash}",
+        fieldname="hash",
+        fieldvalue=hash,
+        userid=userid,
+    )
+
+
 async def get_maze_from_db_by_userid_and_mazenum(userid: UUID, mazenum: int) -> Optional[dict]:
-    mazedata: dict
-    for mazedata in await get_data_by_fields(
-        db=AvailableDBS.mazes, fieldnames=["owner_id", "mazenum"], fieldvalues=[userid, mazenum]
-    ):
-        return mazedata
+    return await _get_maze_from_db_by_index(
+        indexdb=AvailableDBS.mazes_by_owner_mazenum,
+        indexkey=f"{userid}:{mazenum}",
+        fieldname="mazenum",
+        fieldvalue=mazenum,
+        userid=userid,
+    )
+
+
+async def get_maze_index_entry_by_userid_and_mazenum(userid: UUID, mazenum: int) -> Optional[Tuple[UUID, str]]:
+    """
+    (mazeid, hash) straight from the lookup-entry => one direct get, the maze itself is not read (hence unverified)
+    => None if there is no entry (yet) or it was written before it carried the hash
+    """
+    indexdata: dict
+    for indexdata in await get_data_by_key(db=AvailableDBS.mazes_by_owner_mazenum, keyvalue=f"{userid}:{mazenum}"):
+        if indexdata.get("hash"):
+            return UUID(indexdata["mazeid"]), indexdata["hash"]
 
     return None
 
 
 async def get_maze_from_db_by_hash(hash: str) -> Optional[dict]:
     mazedata: dict
-    for mazedata in await get_data_by_field(db=AvailableDBS.mazes, fieldname="hash", fieldvalue=hash):
+    for mazedata in await get_data_by_field(db=AvailableDBS.mazes, fieldname="hash", fieldvalue=hash, limit=1):
         return mazedata
 
     return None
@@ -226,7 +334,7 @@ async def get_maze_from_db_by_hash(hash: str) -> Optional[dict]:
 async def get_maze_solution_from_db_by_hash(mazehash: str) -> Optional[dict]:
     solutiondata: dict
     for solutiondata in await get_data_by_field(
-        db=AvailableDBS.maze_solutions, fieldname="mazehash", fieldvalue=mazehash
+        db=AvailableDBS.maze_solutions, fieldname="mazehash", fieldvalue=mazehash, limit=1
     ):
         return solutiondata
 
@@ -242,34 +350,49 @@ async def get_maze_from_db_by_id(mazeid: UUID) -> Optional[dict]:
 
 
 async def get_all_mazes_from_db_by_userid(userid: UUID) -> List[dict]:
-    ret: List[dict] = []
-    mazedata: dict
-    for mazedata in await get_data_by_field(AvailableDBS.mazes, fieldname="owner_id", fieldvalue=userid):
-        ret.append(mazedata)
+    return await get_data_by_field(AvailableDBS.mazes, fieldname="owner_id", fieldvalue=userid)
 
-    return ret
 
+async def get_next_mazenum_for_user(userid: UUID, max_attempts: int = 16) -> int:
+    """
+    mazenum via per-user counter => one increment instead of fetching all mazes of the user just to count them
+    increment and read-back are two calls => concurrent creates might read the same value, hence every number is
+    reserved by a conflicting insert ("mazenum_{userid}_{mazenum}") and the loser increments again (=> gaps possible)
+    """
+    counterkey: str = f"mazenum_{userid}"
 
-async def get_all_mazes_from_db() -> List[dict]:
-    ret: List[dict] = []
-    mazedata: dict
-    for mazedata in await get_all_data(db=AvailableDBS.mazes):
-        ret.append(mazedata)
+    for _ in range(max_attempts):
+        mazenum: Optional[int] = await increment_counter(db=AvailableDBS.counters, key=counterkey)
+        if mazenum is None:
+            # no counter yet for this user -> seed it (once) from the mazes already in the db
+            mazenum = (
+                max([mazedata["mazenum"] for mazedata in await get_all_mazes_from_db_by_userid(userid)], default=0) + 1
+            )
+            if not await insert_if_absent(db=AvailableDBS.counters, key=counterkey, data={"value": mazenum}):
+                continue  # seeded concurrently by another create -> increment that one
 
-    return ret
+        if await insert_if_absent(
+            db=AvailableDBS.counters, key=f"{counterkey}_{mazenum}", data={"userid": userid, "mazenum": mazenum}
+        ):
+            return mazenum
 
+    raise RuntimeError(f"NO MAZENUM RESERVED AFTER {max_attempts} ATTEMPTS! {userid=}")
 
-async def get_all_maze_solutions_from_db_for_maze(mazeid: UUID) -> List[dict]:
-    ret: List[dict] = []
-    mazedata: dict
-    for mazedata in await get_data_by_field(AvailableDBS.maze_solutions, fieldname="mazeid", fieldvalue=mazeid):
-        ret.append(mazedata)
 
-    return ret
+async def get_all_mazes_from_db() -> List[dict]:
+    return await get_all_data(db=AvailableDBS.mazes)
+
+
+async def get_all_maze_solutions_from_db_for_maze(mazeid: UUID) -> List[dict]:
+    return await get_data_by_field(AvailableDBS.maze_solutions, fieldname="mazeid", fieldvalue=mazeid)
 
 
-async def _save(db: AvailableDBS, id: UUID, data: dict, new_entry: bool = False) -> dict:
-    logger.debug(f"{db=} {id=} {data=} {new_entry=}")
+async def _save(db: AvailableDBS, id: UUID, data: dict, new_entry: bool = False, replace: bool = False) -> dict:
+    """
+    :param data: field-level patch => only the given fields are sent (unless new_entry/replace)
+    :param replace: data is the full entry and overwrites the stored one as a whole (fields not in data are dropped)
+    """
+    logger.debug(f"{db=} {id=} {data=} {new_entry=} {replace=}")
 
     ret: dict
 
@@ -277,20 +400,35 @@ async def _save(db: AvailableDBS, id: UUID, data: dict, new_entry: bool = False)
         ret = await create_new_entry(db=db, key=id, data=data)
         return ret
 
-    prev_data: List[dict] = await get_data_by_key(db=db, keyvalue=id)
+    if replace:
+        await put_entries(db=db, entries=[(id, data)])
+        return data
 
-    prev_data[0].update(**data)
+    # partial update server-side => no read of the previous entry needed
+    logger.debug(f"trying update with {data=} on {id=} in {db=}")
+    await update_data(db=db, key=id, partial_data=data)
 
-    del prev_data[0]["key"]
-
-    logger.debug(f"trying update with {prev_data[0]=} on {id=} in {db=}")
-    await update_data(db=db, key=id, full_data=prev_data[0])
-
-    return prev_data[0]
+    return data
 
 
 async def save_maze(mazeid: UUID, data: dict, new_maze: bool = False) -> dict:
-    return await _save(db=AvailableDBS.mazes, id=mazeid, data=data, new_entry=new_maze)
+    if not new_maze:
+        return await _save(db=AvailableDBS.mazes, id=mazeid, data=data)
+
+    # owner_id, mazenum and hash do not change after creation => lookup-keys only written once
+    ret: dict
+    ret, _, _ = await asyncio.gather(
+        _save(db=AvailableDBS.mazes, id=mazeid, data=data, new_entry=True),
+        put_entries(
+            db=AvailableDBS.mazes_by_owner_mazenum,
+            entries=[(f"{data['owner_id']}:{data['mazenum']}", _maze_index_entry({**data, "id": mazeid}))],
+        ),
+        put_entries(
+            db=AvailableDBS.mazes_by_owner_hash,
+            entries=[(f"{data['owner_id']}:{data['hash']}", _maze_index_entry({**data, "id": mazeid}))],
+        ),
+    )
+    return ret
 
 
 async def save_maze_solution(solution_id: UUID, data: dict, new_solution: bool = False) -> dict:
@@ -301,6 +439,10 @@ async def delete_maze(mazeid: UUID) -> None:
     await delete_entry(db=AvailableDBS.mazes, key=mazeid)
 
 
+async def delete_mazes(mazeids: List[UUID]) -> None:
+    await delete_entries(db=AvailableDBS.mazes, keys=list(mazeids))
+
+
 async def delete_user(mazeid: UUID) -> None:
     await delete_entry(db=AvailableDBS.users, key=mazeid)
 
@@ -316,7 +458,11 @@ async def save_user(userid: UUID, username: str, data: dict, new_user: bool = Fa
         if user_exists:
             raise ValueError(f"USER WITH THAT USERNAME ALREADY EXISTS! {username=}")
 
-        ret = await create_new_entry(db=AvailableDBS.users, key=userid, data=data)
+        # username does not change after creation => lookup-key only written once
+        ret, _ = await asyncio.gather(
+            create_new_entry(db=AvailableDBS.users, key=userid, data=data),
+            put_entries(db=AvailableDBS.users_by_username, entries=[(username, {"userid": userid})]),
+        )
         return ret
 
     prev_data: List[dict] = await get_data_by_key(AvailableDBS.users, keyvalue=userid)
@@ -325,16 +471,17 @@ async def save_user(userid: UUID, username: str, data: dict, new_user: bool = Fa
 
     del prev_data[0]["key"]
 
-    prev_data[0].update(**data)
-    await update_data(db=AvailableDBS.users, key=userid, full_data=prev_data[0])
+    await update_data(db=AvailableDBS.users, key=userid, partial_data=data)
 
+    prev_data[0].update(**data)
     return prev_data[0]
 
 
-async def get_all_users_from_db() -> List[dict]:
-    ret: List[dict] = []
+async def iter_all_users_from_db() -> AsyncIterator[dict]:
     userdata: dict
-    for userdata in await get_all_data(db=AvailableDBS.users):
-        ret.append(userdata)
+    async for userdata in iter_all_data(db=AvailableDBS.users):
+        yield userdata
 
-    return ret
+
+async def get_all_users_from_db() -> List[dict]:
+    return await get_all_data(db=AvailableDBS.users)
@@ -1,7 +1,18 @@
+import asyncio
 import datetime
 import json
+import threading
 from enum import Enum, auto
-from typing import Any, List, Optional, Union, cast
+from typing import (
+    Any,
+    AsyncIterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 from uuid import UUID
 
 from loguru import logger
@@ -58,6 +69,14 @@ class AvailableDBS(MStrEnum):
     mazes: str = cast(str, auto())
     maze_solutions: str = cast(str, auto())
 
+    # denormalized lookup-keys => "{owner_id}:{mazenum}" / "{owner_id}:{hash}" -> {"mazeid": ..., "hash": ...}
+    mazes_by_owner_mazenum = auto()
+    mazes_by_owner_hash = auto()
+    # username -> {"userid": ...}
+    users_by_username = auto()
+
+    counters = auto()
+
 
 _db_map: dict[str, _Base] = {}
 
@@ -65,6 +84,49 @@ m: AvailableDBS
 for m in AvailableDBS:
     _db_map[m.name] = deta.Base(m.name)
 
+_PUT_MANY_MAX_ITEMS: int = 25  # deta-limit for put_many
+
+_main_thread_id: int = threading.get_ident()
+_thread_local_db_maps: threading.local = threading.local()
+_all_thread_db_maps: List[dict[str, _Base]] = []  # all per-thread maps => their connections can be closed on shutdown
+
+
+def _get_db(db: Union[AvailableDBS, str]) -> _Base:
+    """
+    Base-instance for the db => each Base keeps its own persistent (keep-alive) connection which is not thread-safe
+    hence: the main thread (=event-loop) uses the module-level one, every other thread (solver-pool, to_thread) lazily
+    gets its own per db which is then reused for the lifetime of that thread
+    """
+    dbname: str = db.name if isinstance(db, AvailableDBS) else db
+    if threading.get_ident() == _main_thread_id:
+        return _db_map[dbname]
+
+    thread_db_map: Optional[dict[str, _Base]] = getattr(_thread_local_db_maps, "db_map", None)
+    if thread_db_map is None:
+        thread_db_map = {}
+        _thread_local_db_maps.db_map = thread_db_map
+        _all_thread_db_maps.append(thread_db_map)
+
+    _db: Optional[_Base] = thread_db_map.get(dbname)
+    if _db is None:
+        _db = deta.Base(dbname)
+        thread_db_map[dbname] = _db
+
+    return _db
+
+
+def close_db_connections() -> None:
+    """closes the kept-alive connections of all Base-instances (main thread and worker-threads) => on shutdown"""
+    db_map: dict[str, _Base]
+    for db_map in [_db_map, *_all_thread_db_maps]:
+        _db: _Base
+        for _db in db_map.values():
+            client: Any = getattr(_db, "client", None)  # None if the Base was created without keep-alive
+            if client is not None:
+                client.close()
+
+    _all_thread_db_maps.clear()
+
 
 def mangle(data: dict) -> dict:
     return json.loads(json.dumps(data, cls=ComplexEncoder))
@@ -73,12 +135,13 @@ def mangle(data: dict) -> dict:
 async def update_data(
     db: AvailableDBS,
     key: Union[str, UUID],
-    full_data: dict,
+    partial_data: dict,
     expire_in: Optional[int] = None,
     expire_at: Optional[float] = None,
 ) -> None:
-    _db: _Base = _db_map[db.name]
-    _db.update(key=str(key), updates=mangle(full_data), expire_in=expire_in, expire_at=expire_at)
+    """deta merges the given fields into the stored entry server-side => no need to read and send the full entry"""
+    _db: _Base = _get_db(db)
+    _db.update(key=str(key), updates=mangle(partial_data), expire_in=expire_in, expire_at=expire_at)
 
 
 async def create_new_entry(
@@ -88,54 +151,190 @@ async def create_new_entry(
     expire_in: Optional[int] = None,
     expire_at: Optional[float] = None,
 ) -> Any:
-    _db: _Base = _db_map[db.name]
+    _db: _Base = _get_db(db)
     ret: Any = _db.insert(key=str(key), data=mangle(data), expire_in=expire_in, expire_at=expire_at)
     logger.debug(f"{type(ret)=} {ret=}")
     return ret
 
 
+async def insert_if_absent(db: AvailableDBS, key: Union[str, UUID], data: dict) -> bool:
+    """
+    insert => False if the key exists already (deta's insert conflicts then) => usable as an atomic reservation
+    any other failure (network, auth, server-error) is raised => not to be mistaken for a taken key
+    """
+    _db: _Base = _get_db(db)
+    try:
+        _db.insert(key=str(key), data=mangle(data))
+    except Exception as ex:  # deta raises a plain Exception => the 409-conflict only recognizable by its message
+        if "already exists" not in str(ex):
+            raise
+
+        logger.debug(f"{key=} not inserted: {ex}")
+        return False
+
+    return True
+
+
+async def put_entries(db: AvailableDBS, entries: List[Tuple[Union[str, UUID], dict]]) -> None:
+    """
+    puts (=inserts or overwrites) all (key, data)-entries using deta's put_many => max. 25 items per call
+    run in a thread => can be awaited concurrently with other db-calls
+    """
+    if not entries:
+        return
+
+    def _put_all() -> None:
+        _db: _Base = _get_db(db)
+        for i in range(0, len(entries), _PUT_MANY_MAX_ITEMS):
+            items: List[dict] = [
+                {**mangle(data), "key": str(key)} for key, data in entries[i : i + _PUT_MANY_MAX_ITEMS]
+            ]
+            _db.put_many(items)
+
+    await asyncio.to_thread(_put_all)
+
+
+async def increment_counter(
+    db: AvailableDBS, key: Union[str, UUID], fieldname: str = "value", amount: int = 1
+) -> Optional[int]:
+    """increments the counter-field server-side and returns the new value => None if the counter-entry does not exist"""
+    _db: _Base = _get_db(db)
+    try:
+        _db.update(key=str(key), updates={fieldname: _db.util.increment(amount)})
+    except Exception as ex:  # deta raises if the key is not there (yet)
+        logger.debug(f"counter {key=} not incremented: {ex}")
+        return None
+
+    counterdata: Optional[dict] = cast(Optional[dict], _db.get(str(key)))
+    if not counterdata:
+        return None
+
+    return int(counterdata[fieldname])
+
+
 async def delete_entry(db: AvailableDBS, key: Union[str, UUID]) -> None:
-    _db: _Base = _db_map[db.name]
+    _db: _Base = _get_db(db)
     _db.delete(key=str(key))
 
 
-async def get_data_by_field(db: AvailableDBS, fieldname: str, fieldvalue: Union[str, int, float, UUID]) -> List[dict]:
-    return await get_data_by_fields(db=db, fieldnames=[fieldname], fieldvalues=[fieldvalue])
+async def delete_entries(db: AvailableDBS, keys: List[Union[str, UUID]], max_workers: int = 8) -> None:
+    """
+    deletes the keys concurrently => the deta-calls are blocking, hence spread over a few threads
+    each thread gets its own Base (=own connection) via _get_db since a Base-instance is not meant to be shared across
+    threads
+    """
+    if not keys:
+        return
 
+    def _delete_all(thread_keys: List[Union[str, UUID]]) -> None:
+        _db: _Base = _get_db(db)
+        for key in thread_keys:
+            _db.delete(key=str(key))
 
-async def get_all_data(db: AvailableDBS) -> List[dict]:
-    # qdict: dict[str, Union[int, float, str]] = {"key?ne": "___"}
+    workers: int = min(max_workers, len(keys))
+    await asyncio.gather(*[asyncio.to_thread(_delete_all, keys[i::workers]) for i in range(workers)])
 
-    # logger.debug(f"{qdict=}")
-    fetch_res: FetchResponse = _db_map[db.name].fetch()  # qdict)
 
-    ret: List[dict] = []
-    for item in fetch_res.items:
-        logger.debug(f"{type(item)=} {item=}")
-        ret.append(item)
+async def get_data_by_field(
+    db: AvailableDBS, fieldname: str, fieldvalue: Union[str, int, float, UUID], limit: Optional[int] = None
+) -> List[dict]:
+    return await get_data_by_fields(db=db, fieldnames=[fieldname], fieldvalues=[fieldvalue], limit=limit)
+
+
+async def iter_all_data(db: AvailableDBS, pagesize: int = 1000) -> AsyncIterator[dict]:
+    """yields all entries of the db page by page => only one page is held at a time; follows deta's 'last'-cursor"""
+    _db: _Base = _get_db(db)
+    last: Optional[str] = None
+    while True:
+        fetch_res: FetchResponse = _db.fetch(limit=pagesize, last=last)
+        for item in fetch_res.items:
+            yield item
+
+        last = fetch_res.last
+        if not last:
+            return
+
+
+async def get_all_data(db: AvailableDBS) -> List[dict]:
+    ret: List[dict] = [item async for item in iter_all_data(db)]
 
     logger.debug(f" -> {len(ret)=}")
 
     return ret
 
 
-async def get_data_by_fields(
-    db: AvailableDBS, fieldnames: List[str], fieldvalues: List[Union[int, float, str, UUID]]
-) -> List[dict]:
-    qdict: dict[str, Union[int, float, str, UUID]] = {}
+def _build_query(
+    fieldnames: List[str], fieldvalues: Sequence[Optional[Union[int, float, str, UUID]]]
+) -> dict[str, Optional[Union[int, float, str]]]:
+    qdict: dict[str, Optional[Union[int, float, str]]] = {}
     for name, value in zip(fieldnames, fieldvalues):
         if type(value) == UUID:
             qdict[name] = str(value)
         else:
-            qdict[name] = value
+            qdict[name] = cast(Optional[Union[int, float, str]], value)
+
+    return qdict
+
+
+async def get_count_by_fields(
+    db: AvailableDBS,
+    fieldnames: List[str],
+    fieldvalues: List[Optional[Union[int, float, str, UUID]]],
+    greater_than: Optional[dict[str, Union[int, float]]] = None,
+) -> int:
+    """
+    number of entries matching all fields (and being greater than the values in greater_than) => the predicate is
+    evaluated by deta, only the counts per page come back instead of the rows; run in a thread (with its own Base via
+    _get_db) so that several counts can be awaited concurrently
+    """
+    qdict: dict[str, Optional[Union[int, float, str]]] = _build_query(fieldnames, fieldvalues)
+    for name, value in (greater_than or {}).items():
+        qdict[f"{name}?gt"] = value
+
+    logger.debug(f"{qdict=}")
+
+    def _count() -> int:
+        _db: _Base = _get_db(db)
+        count: int = 0
+        last: Optional[str] = None
+        while True:
+            fetch_res: FetchResponse = _db.fetch(qdict, last=last)
+            count += fetch_res.count
+
+            last = fetch_res.last
+            if not last:
+                return count
+
+    return await asyncio.to_thread(_count)
+
+
+async def get_data_by_fields(
+    db: AvailableDBS,
+    fieldnames: List[str],
+    fieldvalues: List[Union[int, float, str, UUID]],
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """
+    :param limit: max. number of entries wanted (forwarded to deta) => e.g. 1 for single-row lookups; deta filters
+    page-wise, so a page might come back without the wanted entries but with a 'last'-cursor => followed until enough
+    entries are found
+    """
+    qdict: dict[str, Optional[Union[int, float, str]]] = _build_query(fieldnames, fieldvalues)
 
     logger.debug(f"{qdict=}")
-    fetch_res: FetchResponse = _db_map[db.name].fetch(qdict)
+    _db: _Base = _get_db(db)
+    fetch_res: FetchResponse = _db.fetch(qdict, limit=limit)
 
     ret: List[dict] = []
-    for item in fetch_res.items:
-        logger.debug(f"{type(item)=} {item=}")
-        ret.append(item)
+    while True:
+        for item in fetch_res.items:
+            logger.debug(f"{type(item)=} {item=}")
+            ret.append(item)
+
+        if limit is None or len(ret) >= limit or not fetch_res.last:
+            break
+
+        fetch_res = _db.fetch(qdict, limit=limit - len(ret), last=fetch_res.last)
 
     logger.debug(f" -> {len(ret)=}")
 
@@ -143,7 +342,7 @@ async def get_data_by_fields(
 
 
 async def get_data_by_key(db: AvailableDBS, keyvalue: Union[str, UUID]) -> List[dict]:
-    fetch_res: FetchResponse = _db_map[db.name].get(str(keyvalue))
+    fetch_res: FetchResponse = _get_db(db).get(str(keyvalue))
     logger.debug(f"{type(fetch_res)=}  {fetch_res=}")
 
     ret: List[dict] = []
@@ -166,7 +365,7 @@ def rekey_db(db: AvailableDBS, newkeyfieldname: str) -> None:
     """changes the key to the column's value of 'newkeyfieldname':
     => deletes the 'old' entry and insert the old entry under a new key
     """
-    dbh: _Base = _db_map[db]
+    dbh: _Base = _get_db(db)
 
     fetch_res = dbh.fetch()
 
@@ -188,7 +387,7 @@ def rekey_db(db: AvailableDBS, newkeyfieldname: str) -> None:
 
 def clean_db(db: AvailableDBS) -> None:
     """deletes all rows from db"""
-    dbh: _Base = _db_map[db]
+    dbh: _Base = _get_db(db)
 
     fetch_res = dbh.fetch()
 
@@ -1,10 +1,7 @@
 from __future__ import annotations
 
 import asyncio
-from asyncio import AbstractEventLoop
-from concurrent.futures import Future, ThreadPoolExecutor
-from threading import Semaphore
-from typing import Any, List, Literal, Optional, Tuple, Union, cast
+from typing import List, Literal, Optional, Set
 
 from loguru import logger
 
@@ -31,22 +28,27 @@ from mazemaster.solvers.gridmodels import (
 )
 
 import anyio
-from anyio import Lock
-from ordered_set import OrderedSet
+from anyio import CapacityLimiter
 
 
 solution_workers_max: int = 3
 solution_tasks_max_in_queue: int = 2
-semaphore: Semaphore = Semaphore(solution_tasks_max_in_queue)
 
-_maze_process_check_lock = Lock()
+# only the cpu-bound solver-calls are handed to a worker-thread => db-io of the solver stays on the main event-loop
+_cpu_limiter: Optional[CapacityLimiter] = None
 
-executor: Optional[ThreadPoolExecutor] = None
-try:
-    executor = ThreadPoolExecutor(solution_workers_max)
-    logger.debug(f"ThreadPoolExecutor successfully instantiated with max. {solution_workers_max} threads")
-except Exception as ex:
-    logger.exception("ThreadPoolExecutor could not be instantiated", exception=ex)
+# solver-runs currently scheduled on the main event-loop (strong refs => tasks are not garbage-collected midway)
+_solver_tasks: Set[asyncio.Task] = set()
+
+
+def _get_cpu_limiter() -> CapacityLimiter:
+    """created lazily => anyio needs a running event-loop to detect the async-backend"""
+    global _cpu_limiter
+
+    if _cpu_limiter is None:
+        _cpu_limiter = CapacityLimiter(solution_workers_max)
+
+    return _cpu_limiter
 
 
 class TooManySolutionsProcessingException(Exception):
@@ -54,6 +56,17 @@ class TooManySolutionsProcessingException(Exception):
         super().__init__(*args)
 
 
+def _search_exits_cpu(solverimpl: SolverProtocol, grid: SquareGrid, start: GridLocation) -> List[GridNode]:
+    # a second exit already makes the maze invalid => no need to search for more than two
+    return solverimpl.search_all_available_exits(grid=grid, start=start, max_exits=2)
+
+
+def _search_longest_path_cpu(
+    solverimpl: SolverProtocol, grid: SquareGrid, start: GridLocation, goal: GridLocation
+) -> Optional[GridNode]:
+    return solverimpl.search_longest_path(grid=grid, start=start, goal=goal)
+
+
 async def solver(
     solution: MazeSolution,
     maze: Maze,
@@ -65,11 +78,15 @@ async def solver(
 
     width, height = maze.get_grid_size_as_int_tuple()
     dim: Dimension = Dimension(width=width, height=height)
-    grid: SquareGrid = SquareGrid.from_excel_array(dimension=dim, walldata=[str(k) for k in maze.walls])
+    grid: SquareGrid = SquareGrid.from_excel_array(dimension=dim, walldata=maze.walls)  # already plain str-values
+
+    # PROCESSING already persisted in this run => the max-phase does not need to announce it again
+    processing_saved: bool = False
 
     if solution.status == MazeSolutionStatus.NEW:
         solution.status = MazeSolutionStatus.PROCESSING
-        await solution.save()
+        await solution.save(fields={"status"})
+        processing_saved = True
 
         exits: Optional[List[GridNode]] = None
 
@@ -79,9 +96,13 @@ async def solver(
             return None
 
         try:
-            exits = solverimpl_min.search_all_available_exits(
-                grid=grid, start=GridLocation(*extracteinfo(maze.entrance))
-            )  # maze.entrance.value)))
+            exits = await anyio.to_thread.run_sync(
+                _search_exits_cpu,
+                solverimpl_min,
+                grid,
+                GridLocation(*extracteinfo(maze.entrance)),  # maze.entrance.value)))
+                limiter=_get_cpu_limiter(),
+            )
         except StartOutOfBoundsException as oob:
             logger.exception("start is out of bounds", exception=oob)
             solution.status = MazeSolutionStatus.INVALID_ENTRY_OUTOFBOUNDS
@@ -96,16 +117,20 @@ async def solver(
             solution.status = MazeSolutionStatus.SOLVED_MIN
             solution.detected_exit = ExcelCoordinate(f"{to_excel(exits[0].location.col)}{exits[0].location.row+1}")
 
-            _steps_ordered_set: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exits[0]))
-            _steps_excel: List[str] = get_steps_as_excel_list(_steps_ordered_set)
+            _steps_excel: List[str] = get_steps_as_excel_list(backtrack_node_to_start(exits[0]))
 
-            solution.solution_min = [ExcelCoordinate(k) for k in _steps_excel]
+            solution.solution_min = list(map(ExcelCoordinate, _steps_excel))
         elif exits and len(exits) == 0:
             solution.status = MazeSolutionStatus.INVALID_NOEXIT
         elif exits and len(exits) > 1:
             solution.status = MazeSolutionStatus.INVALID_MULTIEXIT
 
-        await solution.save()  # reload into self.dict ?!
+        if steps == "max" and solution.status == MazeSolutionStatus.SOLVED_MIN:
+            # persisted before the max-phase => not lost if that one fails/times out/the process dies; PROCESSING was
+            # already announced above => not written separately again
+            await solution.save(fields={"status", "solution_min", "detected_exit"})
+        else:
+            await solution.save()  # reload into self.dict ?!
 
     if steps == "min" and (
         solution.status == MazeSolutionStatus.SOLVED_MIN
@@ -116,15 +141,18 @@ async def solver(
     elif steps == "max" and solution.status == MazeSolutionStatus.SOLVED_MAX:
         ret = solution.solution_max
     elif solution.detected_exit and steps == "max" and solution.status == MazeSolutionStatus.SOLVED_MIN:
-        solution.status = MazeSolutionStatus.PROCESSING
-        await solution.save()
+        if not processing_saved:
+            solution.status = MazeSolutionStatus.PROCESSING
+            await solution.save(fields={"status"})
 
         goal: GridLocation = GridLocation(*extracteinfo(solution.detected_exit))  # .value))
         start: GridLocation = GridLocation(*extracteinfo(maze.entrance))  # .value))
         exit_grid_node: Optional[GridNode] = None
 
         try:
-            exit_grid_node = solverimpl_max.search_longest_path(grid=grid, start=start, goal=goal)
+            exit_grid_node = await anyio.to_thread.run_sync(
+                _search_longest_path_cpu, solverimpl_max, grid, start, goal, limiter=_get_cpu_limiter()
+            )
         except Exception as eex:
             logger.exception("undefined error", exception=eex)
 
@@ -132,10 +160,9 @@ async def solver(
             solution.status = MazeSolutionStatus.SOLVED_MAX
             # saved: MazeSolution = await solution.save()  # could even save twice here...
 
-            steps_ordered_set: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exit_grid_node))
-            steps_excel: List[str] = get_steps_as_excel_list(steps_ordered_set)
+            steps_excel: List[str] = get_steps_as_excel_list(backtrack_node_to_start(exit_grid_node))
 
-            solution.solution_max = [ExcelCoordinate(k) for k in steps_excel]
+            solution.solution_max = list(map(ExcelCoordinate, steps_excel))
             await solution.save()  # reload into self.dict ?!
 
             ret = solution.solution_max
@@ -146,17 +173,7 @@ async def solver(
     return ret
 
 
-def maze_solution_calculation_done(future: Future) -> None:
-    global semaphore
-    logger.debug(f"{future.cancelled()=} {future.done()=} {future.result()=}")
-    semaphore.release()
-
-
-async def trigger_solver(
-    solution: MazeSolution, maze: Maze, steps: Literal["min", "max"]
-) -> Optional[Union[Future, List[ExcelCoordinate]]]:
-    global semaphore, executor, _maze_process_check_lock
-
+async def trigger_solver(solution: MazeSolution, maze: Maze, steps: Literal["min", "max"]) -> Optional[asyncio.Task]:
     solverimpl_min: SolverProtocol = BFSSolver  # type: ignore    # or Astar
     solverimpl_max: SolverProtocol = DFSSolver  # type: ignore
 
@@ -164,21 +181,22 @@ async def trigger_solver(
         logger.debug(f"Already processing: {maze.hash=} {steps=}")
         return None
 
-    if not executor:  # could be if deta-runtime does not allow a threadpool-executor
-        path: Optional[List[ExcelCoordinate]] = await solver(
-            solution=solution, maze=maze, steps=steps, solverimpl_min=solverimpl_min, solverimpl_max=solverimpl_max
+    if len(_solver_tasks) >= solution_tasks_max_in_queue:
+        raise TooManySolutionsProcessingException(
+            "There are already too many mazes trying to be solved... please come back later..."
         )
-        return path
-    else:
-        proceed: bool = semaphore.acquire(blocking=False)
 
-        if not proceed:
-            raise TooManySolutionsProcessingException(
-                "There are already too many mazes trying to be solved... please come back later..."
-            )
-
-        future: Future[Optional[List[ExcelCoordinate]]] = executor.submit(asyncio.run, solver(solution=solution, maze=maze, steps=steps, solverimpl_min=solverimpl_min, solverimpl_max=solverimpl_max))  # type: ignore
-        future.add_done_callback(maze_solution_calculation_done)
-        logger.debug(f"Added solver for maze {maze.hash=} with {steps=} to threadpool...")
+    task: asyncio.Task = asyncio.create_task(
+        solver(
+            solution=solution,
+            maze=maze,
+            steps=steps,
+            solverimpl_min=solverimpl_min,
+            solverimpl_max=solverimpl_max,
+        )
+    )
+    _solver_tasks.add(task)
+    task.add_done_callback(_solver_tasks.discard)
+    logger.debug(f"Added solver for maze {maze.hash=} with {steps=} to the event-loop...")
 
-        return future
+    return task
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import asyncio
 import datetime
-from random import randint, random, sample, uniform
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from random import randint, random, sample, seed, uniform
 from typing import List, Literal, Optional, Set, Tuple, Union
 from uuid import UUID
 
@@ -18,7 +19,7 @@ from mazemaster.utils.configuration import settings
 
 from mazemaster.utils.detadbwrapper import (
     AvailableDBS,
-    create_new_entry,
+    put_entries,
 )
 
 import pytz
@@ -44,13 +45,17 @@ def generate_pseudo_user_data() -> dict:
     fake.add_provider(MProvider)
     fake.add_provider(PProvider)
 
+    # faker is not thread-safe => passwords upfront; bcrypt releases the gil => the hashes are created concurrently
+    pws: List[str] = [
+        fake.password(length=9, special_chars=False, digits=True, upper_case=True, lower_case=True) + f"-{i:02}"
+        for i in range(0, 10)
+    ]
+    with ThreadPoolExecutor() as executor:
+        hashes: List[str] = list(executor.map(create_password_hash, pws))
+
     tt: str = ""  # ugly, but logging messes this up (at least) if loglevel is DEBUG
     ret: dict = {}
-    for i in range(0, 10):
-        pw: str = (
-            fake.password(length=9, special_chars=False, digits=True, upper_case=True, lower_case=True) + f"-{i:02}"
-        )
-        hash: str = create_password_hash(pw)
+    for i, (pw, hash) in enumerate(zip(pws, hashes)):
         userid: UUID = uuid4()
         username: str = f"{fake.unique.name().replace(' ', '')}-{i:02}"
 
@@ -151,26 +156,32 @@ def generate_pseudo_maze_data(user_id: UUID, amount: int = 10) -> dict[str, dict
         num_exits: int = randint(1, 3)  # this does not mean, the exit is reachable!!!
         exit_cols: List[int] = sample(range(-1, cols), num_exits)
 
-        # if uniform(0, 1.0) < obstacle_perc:
+        # column-labels once per maze instead of to_excel per cell; random() == uniform(0, 1.0) without the scaling
+        col_labels: List[str] = [to_excel(column) for column in range(cols)]
         walls: List[ExcelCoordinate] = []
         for row in range(rows):
+            if row != rows - 1:
+                walls += [
+                    ExcelCoordinate(f"{col_labels[column]}{row+1}")
+                    for column in range(cols)
+                    if (column != entrance_col or row != entrance_row) and random() < obstacle_perc
+                ]
+                continue
+
             for column in range(cols):
                 if column == entrance_col and row == entrance_row:
                     continue
 
-                e_coord: ExcelCoordinate = ExcelCoordinate(
-                    f"{to_excel(column)}{row+1}"
-                )  # ExcelCoordinate(value=f"{to_excel(column)}{row+1}")
+                e_coord: ExcelCoordinate = ExcelCoordinate(f"{col_labels[column]}{row+1}")
 
-                if uniform(0, 1.0) < obstacle_perc:
+                if random() < obstacle_perc:
                     walls.append(e_coord)
 
                 # special-case: add line at the bottom aside exit
-                if row == rows - 1:
-                    if column in exit_cols:  # do not "overpaint" exits
-                        continue
+                if column in exit_cols:  # do not "overpaint" exits
+                    continue
 
-                    walls.append(e_coord)
+                walls.append(e_coord)
 
         mi: MazeInput = MazeInput(grid_size=grid_size, walls=walls, entrance=entrance)
         mhash: str = mi.get_maze_hash()
@@ -192,23 +203,37 @@ def generate_pseudo_maze_data(user_id: UUID, amount: int = 10) -> dict[str, dict
 
 
 async def generate_pseudo_data_to_db() -> None:
-    _pseudo_key_db = generate_pseudo_keydata()
-    for key, values in _pseudo_key_db.items():
-        await create_new_entry(db=AvailableDBS.keys, key=key, data=values)
-
-    _pseudo_user_db = generate_pseudo_user_data()
-    for key, values in _pseudo_user_db.items():
-        logger.debug(f"{key=} {values=}")
-        await create_new_entry(db=AvailableDBS.users, key=key, data=values)
-
-    _pseudo_maze_db = {}
-    for i, us in enumerate(_pseudo_user_db.values()):
-        if i % 3 == 0:
-            _me: dict = generate_pseudo_maze_data(us["id"])
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+    # rsa-keygen, bcrypt-hashing and maze-generation are cpu-bound and independent of each other => own processes
+    # seed() per worker (from os.urandom) => forked workers do not share the parent's random-state (=identical mazes)
+    with ProcessPoolExecutor(initializer=seed) as executor:
+        _pseudo_key_db: dict
+        _pseudo_user_db: dict
+        _pseudo_key_db, _pseudo_user_db = await asyncio.gather(
+            loop.run_in_executor(executor, generate_pseudo_keydata),
+            loop.run_in_executor(executor, generate_pseudo_user_data),
+        )
+        for key, values in _pseudo_user_db.items():
+            logger.debug(f"{key=} {values=}")
+
+        _pseudo_maze_db: dict = {}
+        _me: dict
+        for _me in await asyncio.gather(
+            *[
+                loop.run_in_executor(executor, generate_pseudo_maze_data, us["id"])
+                for i, us in enumerate(_pseudo_user_db.values())
+                if i % 3 == 0
+            ]
+        ):
             _pseudo_maze_db.update(_me)
 
-    for key, values in _pseudo_maze_db.items():
-        await create_new_entry(db=AvailableDBS.mazes, key=key, data=values)
+    # all generated upfront => the writes to the three dbs do not depend on each other; put_many => 25 per request
+    await asyncio.gather(
+        put_entries(db=AvailableDBS.keys, entries=list(_pseudo_key_db.items())),
+        put_entries(db=AvailableDBS.users, entries=list(_pseudo_user_db.items())),
+        put_entries(db=AvailableDBS.mazes, entries=list(_pseudo_maze_db.items())),
+    )
 
 
 if __name__ == "__main__":
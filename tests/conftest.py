@@ -10,7 +10,9 @@ from fastapi.testclient import TestClient
 from loguru import logger
 
 from mazemaster.app import app, shutdown_event, startup_event
+from mazemaster.datastructures.models_and_schemas import MazeInput
 from mazemaster.utils.configuration import settings
+from tests.walldata import mazeinput, mazeinput2
 
 import pytest
 from httpx import AsyncClient, Response
@@ -82,54 +84,44 @@ async def get_new_access_token(
     return new_access_token
 
 
-@pytest.fixture(scope="module")
-async def create_user_modulescoped(fastapi_client: AsyncClient) -> Tuple[str, str, str, UUID]:
-    """returns tuple (access_token, refresh_token, username, userid)"""
-    pf: str = f"{platform.node()}-{os.getpid()}!"
-    username: str = f"PyTest-MAZERMOD-{pf}"
-    password: str = "MEissECRE4ddd!"
-    response: Response = await fastapi_client.post(
-        "/user",
-        json={"username": username, "password": password},
-        headers={"content-type": "application/json"},
-    )
-
-    # logger.trace(response.text)
-    response_data = response.json()
-    # logger.trace(response_data)
+@pytest.fixture(scope="session")
+def user_password() -> str:
+    """password of the session-scoped test-user => tests changing it can set it back"""
+    return "MEissECRE4ddd!"
 
-    assert response.status_code == 201
-    assert "username" in response_data and response_data["username"] == username
-    assert "id" in response_data
 
-    userid: UUID = UUID(response_data["id"])
+@pytest.fixture(scope="module")
+async def create_user_modulescoped(
+    fastapi_client: AsyncClient, create_user: Tuple[str, str, str, UUID], user_password: str
+) -> Tuple[str, str, str, UUID]:
+    """returns tuple (access_token, refresh_token, username, userid)
+    => the session-scoped user with its own token-pair per module (login) instead of registering+deleting a user per
+    module; a login and not a refresh of the session-tokens => modules invalidating their tokens do not affect others
+    """
+    username: str = create_user[2]
+    userid: UUID = create_user[3]
 
-    response = await fastapi_client.post(
+    response: Response = await fastapi_client.post(
         "/login",
-        data={"username": username, "password": password, "grant_type": "password"},
+        data={"username": username, "password": user_password, "grant_type": "password"},
         headers={"content-type": "application/x-www-form-urlencoded"},
     )
 
     assert response.status_code == status.HTTP_201_CREATED
     response_data = response.json()
-    # print(response_data)
     assert "access_token" in response_data
     assert "refresh_token" in response_data
     assert "token_type" in response_data and response_data["token_type"] == "bearer"
 
-    yield response_data["access_token"], response_data["refresh_token"], username, userid
-
-    response_del: Response = await fastapi_client.delete(
-        "/me", headers={"Authorization": f"Bearer {response_data['access_token']}"}
-    )
+    return response_data["access_token"], response_data["refresh_token"], username, userid
 
 
 @pytest.fixture(scope="session")
-async def create_user(fastapi_client: AsyncClient) -> Tuple[str, str, str, UUID]:
+async def create_user(fastapi_client: AsyncClient, user_password: str) -> Tuple[str, str, str, UUID]:
     """returns tuple (access_token, refresh_token, username, userid)"""
     pf: str = f"{platform.node()}-{os.getpid()}!"
     username: str = f"PyTest-MAZER-{pf}"
-    password: str = "MEissECRE4ddd!"
+    password: str = user_password
     response: Response = await fastapi_client.post(
         "/user",
         json={"username": username, "password": password},
@@ -164,3 +156,50 @@ async def create_user(fastapi_client: AsyncClient) -> Tuple[str, str, str, UUID]
     response_del: Response = await fastapi_client.delete(
         "/me", headers={"Authorization": f"Bearer {response_data['access_token']}"}
     )
+
+
+# expected hashes of the test-mazes => computed once at load
+_mazeinput_hash: str = MazeInput(**mazeinput).get_maze_hash()
+_mazeinput2_hash: str = MazeInput(**mazeinput2).get_maze_hash()
+
+
+# access_token, refresh_token, username, use => session-scoped: both mazes are posted once and shared by all modules
+@pytest.fixture(scope="session")
+async def maze_create(fastapi_client: AsyncClient, create_user: Tuple[str, str, str, UUID]) -> Tuple[int, UUID, str]:
+
+    response_post: Response = await fastapi_client.post(
+        "/maze",
+        headers={"Authorization": f"Bearer {create_user[0]}", "content-type": "application/json"},
+        json=mazeinput,  # here, not really necessary to dump and re-load
+    )
+
+    response_post_json: dict = response_post.json()
+
+    assert response_post.status_code == status.HTTP_201_CREATED
+    assert UUID(response_post_json["owner_id"]) == create_user[3]
+    assert response_post_json["hash"] == _mazeinput_hash
+    assert int(response_post_json["mazenum"]) == 1
+    assert "id" in response_post_json
+
+    return 1, UUID(response_post_json["id"]), response_post_json["hash"]
+
+
+@pytest.fixture(scope="session")
+async def maze_create2(fastapi_client: AsyncClient, create_user: Tuple[str, str, str, UUID]) -> Tuple[int, UUID, str]:
+
+    response_post: Response = await fastapi_client.post(
+        "/maze",
+        headers={"Authorization": f"Bearer {create_user[0]}", "content-type": "application/json"},
+        json=mazeinput2,  # here, not really necessary to dump and re-load
+    )
+
+    response_post_json: dict = response_post.json()
+    logger.debug(response_post_json)
+
+    assert response_post.status_code == status.HTTP_201_CREATED
+    assert UUID(response_post_json["owner_id"]) == create_user[3]
+    assert response_post_json["hash"] == _mazeinput2_hash
+    assert int(response_post_json["mazenum"]) == 2
+    assert "id" in response_post_json
+
+    return 2, UUID(response_post_json["id"]), response_post_json["hash"]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import functools
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional, Tuple
 
 from mazemaster.datastructures.models_and_schemas import ExcelCoordinate
@@ -20,19 +23,36 @@ from mazemaster.solvers.gridmodels import (
 )
 from tests.walldata import walldataset
 
-from ordered_set import OrderedSet
-
 
 # This is the same as using the @pytest.mark.anyio on all test functions in the module
 # pytestmark = pytest.mark.anyio(scope="session")
 
 
+# base-seed for the random runs => run i uses its own generator seeded with _RANDOM_SEED + i (reproducible)
+_RANDOM_SEED: int = 0xC0FFEE
+
+# drawing every grid/path to stdout dominates the runtime of the runs below => only on demand (default for the
+# verbose-parameter of find_all_exits/find_longest)
+VERBOSE: bool = os.getenv("MAZE_TEST_VERBOSE", "0") not in ("", "0")
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_grid(dim_tuple: Tuple[int, int], walls_tuple: Tuple[str, ...]) -> SquareGrid:
+    """same walldata => same grid; the solvers do not modify the grid, so it can be shared between runs"""
+    return SquareGrid.from_excel_array(dimension=Dimension(*dim_tuple), walldata=walls_tuple)
+
+
+# walldataset is static => parse every entry into its grid once at import (shared with the helpers via the cache)
+_PREBUILT: List[Tuple[Dimension, GridLocation, SquareGrid]] = [
+    (dim, start, _cached_grid((dim.width, dim.height), tuple(wlist))) for dim, start, wlist in walldataset
+]
+
+
 def _search_defined_exit_astar() -> None:
     dim, start, wlist = walldataset[0]
     goal: GridLocation = GridLocation(*extracteinfo("A8"))  # testdata!
 
-    walls_ordered: OrderedSet[GridLocation] = OrderedSet([GridLocation(*extracteinfo(w)) for w in wlist])
-    grid: SquareGrid = SquareGrid.from_excel_array(dimension=dim, walldata=wlist)
+    grid: SquareGrid = _cached_grid((dim.width, dim.height), tuple(wlist))
 
     grid.print(start=start, end=goal)
 
@@ -43,7 +63,7 @@ def _search_defined_exit_astar() -> None:
     grid.print_walls_array()
 
     if exitnode:
-        steps: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exitnode))
+        steps: List[GridLocation] = backtrack_node_to_start(exitnode)
 
         grid.print(indent=4, start=start, end=exitnode.location, steps=steps)
         print(get_steps_as_excel(steps))
@@ -54,8 +74,7 @@ def _search_longest_defined_path() -> None:
     dim, start, wlist = walldataset[2]
     goal: GridLocation = GridLocation(*extracteinfo("A10"))  # testdata!
 
-    walls_ordered: OrderedSet[GridLocation] = OrderedSet([GridLocation(*extracteinfo(w)) for w in wlist])
-    grid: SquareGrid = SquareGrid.from_excel_array(dimension=dim, walldata=wlist)
+    grid: SquareGrid = _cached_grid((dim.width, dim.height), tuple(wlist))
 
     grid.print(start=start, end=goal)
 
@@ -66,7 +85,7 @@ def _search_longest_defined_path() -> None:
     grid.print_walls_array()
 
     if exitnode:
-        steps: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exitnode))
+        steps: List[GridLocation] = backtrack_node_to_start(exitnode)
 
         grid.print(indent=4, start=start, end=exitnode.location, steps=steps)
         print(get_steps_as_excel_list(steps))
@@ -87,106 +106,148 @@ def get_randomly_generatd_grid(
     return rgrid
 
 
-def find_all_exits(grid: SquareGrid, start: GridLocation, solver: SolverProtocol) -> List[GridNode]:
-    grid.print()
+def find_all_exits(
+    grid: SquareGrid, start: GridLocation, solver: SolverProtocol, verbose: bool = VERBOSE
+) -> List[GridNode]:
+    if verbose:
+        grid.print()
 
     exits: List[GridNode] = solver.search_all_available_exits(grid, start)
 
-    print(
-        f"Dimension(width={grid.dimension.width}, height={grid.dimension.height}), GridLocation(row={start.row}, col={start.col}"
-    )
-    grid.print_walls_array()
-    print(f"exits found: {len(exits)}\n\n")
+    if verbose:
+        print(
+            f"Dimension(width={grid.dimension.width}, height={grid.dimension.height}), GridLocation(row={start.row}, col={start.col}"
+        )
+        grid.print_walls_array()
+        print(f"exits found: {len(exits)}\n\n")
 
-    for e in exits:
-        steps: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(e))
-        grid.print(indent=4, start=start, end=e.location, steps=steps)
-        print(get_steps_as_excel(steps))
-        print("\n")
+        for e in exits:
+            steps: List[GridLocation] = backtrack_node_to_start(e)
+            grid.print(indent=4, start=start, end=e.location, steps=steps)
+            print(get_steps_as_excel(steps))
+            print("\n")
 
     return exits
 
 
 def find_longest(
-    grid: SquareGrid, start: GridLocation, goal: GridLocation, solver: SolverProtocol
+    grid: SquareGrid, start: GridLocation, goal: GridLocation, solver: SolverProtocol, verbose: bool = VERBOSE
 ) -> Optional[List[ExcelCoordinate]]:
     # grid.print()
 
     exitnode: Optional[GridNode] = solver.search_longest_path(grid, start=start, goal=goal)
 
-    print(f"\tLONGESTPATH FOUND: {exitnode}\n\n")
+    return _longest_as_excel(grid=grid, start=start, exitnode=exitnode, verbose=verbose)
+
+
+def find_longest_capped(
+    grid: SquareGrid, start: GridLocation, goal: GridLocation, max_iterations: int, verbose: bool = VERBOSE
+) -> Tuple[Optional[List[ExcelCoordinate]], bool]:
+    """DFSSolver with an iteration-cap => (longestpath, capped) with capped: the cap was hit"""
+    exitnode: Optional[GridNode]
+    capped: bool
+    exitnode, capped = DFSSolver.search_longest_path_capped(grid, start=start, goal=goal, max_iterations=max_iterations)
+
+    if verbose and capped:
+        print(f"\tLONGESTPATH SEARCH CAPPED AFTER {max_iterations} ITERATIONS")
+
+    return _longest_as_excel(grid=grid, start=start, exitnode=exitnode, verbose=verbose), capped
+
+
+def _longest_as_excel(
+    grid: SquareGrid, start: GridLocation, exitnode: Optional[GridNode], verbose: bool
+) -> Optional[List[ExcelCoordinate]]:
+    if verbose:
+        print(f"\tLONGESTPATH FOUND: {exitnode}\n\n")
 
     ret: Optional[List[ExcelCoordinate]] = None
     if exitnode:
-        steps: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exitnode))
-        ret = [ExcelCoordinate(k) for k in get_steps_as_excel_list(steps)]
+        steps: List[GridLocation] = backtrack_node_to_start(exitnode)
+        ret = list(map(ExcelCoordinate, get_steps_as_excel_list(steps)))
 
-        grid.print(indent=6, start=start, end=exitnode.location, steps=steps)
-        print("Walls: ", end="")
-        grid.print_walls_array()
-        # print(get_steps_as_excel(steps))
-        print(ret)
-        print("\n")
+        if verbose:
+            grid.print(indent=6, start=start, end=exitnode.location, steps=steps)
+            print("Walls: ", end="")
+            grid.print_walls_array()
+            # print(get_steps_as_excel(steps))
+            print(ret)
+            print("\n")
 
     return ret
 
 
-def makerandomrun(randomcount: int = 3) -> None:
-    """runs over the walldata-testset and tries the solvers/creates solutions-map for further use
-    :param randomcount => if gt 0, then random mazes are generated and tried to solve...
-    """
+# (exitloc, exitcount, shortestpath, longestpath, capped) => capped: the DFS hit its iteration-cap => longestpath is
+# the longest one found until then, not necessarily the longest one possible
+_RandomSolution = Tuple[
+    Optional[GridLocation], int, Optional[List[ExcelCoordinate]], Optional[List[ExcelCoordinate]], bool
+]
+
+
+def _run_one(i: int) -> List[_RandomSolution]:
+    """one random grid (own seed => reproducible and independent of the other runs) with all solvers"""
     solvers_short: List[SolverProtocol] = [BFSSolver]  # , AstarSolver]
-    solvers_long: List[SolverProtocol] = [DFSSolver]
 
-    randsolutions: List[
-        Tuple[Optional[GridLocation], int, Optional[List[ExcelCoordinate]], Optional[List[ExcelCoordinate]]]
-    ] = []
+    rng: random.Random = random.Random(_RANDOM_SEED + i)
+    randsolutions: List[_RandomSolution] = []
 
-    for i in range(0, randomcount):
-        rdimension: Dimension = Dimension(width=10, height=10)
-        rstart = GridLocation(row=0, col=0)
-        rend_col_rand: int = random.randint(0, rdimension.width - 1)
-        rend = GridLocation(row=rdimension.height - 1, col=rend_col_rand)  # 0 vs 1-based-index
+    rdimension: Dimension = Dimension(width=10, height=10)
+    rstart = GridLocation(row=0, col=0)
+    rend_col_rand: int = rng.randrange(rdimension.width)
+    rend = GridLocation(row=rdimension.height - 1, col=rend_col_rand)  # 0 vs 1-based-index
 
-        randgrid: SquareGrid = SquareGrid.create_random_grid(
-            startpos=rstart, endpos=rend, dimension=rdimension, obstacle_perc=0.2
-        )
+    randgrid: SquareGrid = SquareGrid.create_random_grid(
+        startpos=rstart, endpos=rend, dimension=rdimension, obstacle_perc=0.2, rng=rng
+    )
+    max_iterations: int = rdimension.width * rdimension.height
 
-        for solvershort in solvers_short:
-            longestpath: Optional[List[ExcelCoordinate]] = None
-            shortestpath: Optional[List[ExcelCoordinate]] = None
-            exitloc: Optional[GridLocation] = None
-            exitcount: int = -1
+    for solvershort in solvers_short:
+        longestpath: Optional[List[ExcelCoordinate]] = None
+        shortestpath: Optional[List[ExcelCoordinate]] = None
+        exitloc: Optional[GridLocation] = None
+        exitcount: int = -1
+        capped: bool = False
 
-            print(f"WORKING ON RANDOMGRID #{i+1}")
-            print(f"Trying to use {solvershort.__name__} for find all paths...")  # type: ignore
+        print(f"WORKING ON RANDOMGRID #{i+1}")
+        print(f"Trying to use {solvershort.__name__} for find all paths...")  # type: ignore
 
-            try:
-                exits: List[GridNode] = find_all_exits(randgrid, rstart, solvershort)
-                exitcount = len(exits)
+        try:
+            exits: List[GridNode] = find_all_exits(randgrid, rstart, solvershort)
+            exitcount = len(exits)
 
-                if exitcount == 1:
-                    steps: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exits[0]))
-                    shortestpath = [ExcelCoordinate(k) for k in get_steps_as_excel_list(steps)]
+            if exitcount == 1:
+                steps: List[GridLocation] = backtrack_node_to_start(exits[0])
+                shortestpath = list(map(ExcelCoordinate, get_steps_as_excel_list(steps)))
 
-                    exitloc = exits[0].location
+                exitloc = exits[0].location
 
-                if len(exits) == 1 and exitloc:
-                    for solverlong in solvers_long:
-                        print(f"Trying to use {solverlong.__name__} for longest path...")  # type: ignore
-                        try:
-                            longestpath = find_longest(grid=randgrid, start=rstart, solver=solverlong, goal=exitloc)
-                        except NotImplementedError as nie:
-                            print("Longest path search not implemented for this solver...")
+            if len(exits) == 1 and exitloc:
+                print(f"Trying to use {DFSSolver.__name__} for longest path...")
+                # DFS-longest explodes on some random grids => bounded by the number of cells
+                longestpath, capped = find_longest_capped(
+                    grid=randgrid, start=rstart, goal=exitloc, max_iterations=max_iterations
+                )
 
-                randsolutions.append((exitloc, exitcount, shortestpath, longestpath))
-            except NotImplementedError as nie:
-                print("Find all paths search not implemented for this solver...")
+            randsolutions.append((exitloc, exitcount, shortestpath, longestpath, capped))
+        except NotImplementedError as nie:
+            print("Find all paths search not implemented for this solver...")
 
-            print("#" * 80)
+        print("#" * 80)
 
-        print("RANDOMDATA!!!\nSOLUTIONS [fitting for e.g. walldata.solutions]")
-        print(randsolutions)
+    return randsolutions
+
+
+def makerandomrun(randomcount: int = 3) -> None:
+    """generates random mazes and tries the solvers on them/creates solutions-map for further use
+    :param randomcount => number of random mazes => solved in parallel (one process each)
+    """
+    randsolutions: List[_RandomSolution] = []
+
+    with ProcessPoolExecutor() as executor:
+        for run_solutions in executor.map(_run_one, range(0, randomcount)):
+            randsolutions.extend(run_solutions)
+
+    print("RANDOMDATA!!!\nSOLUTIONS [fitting for e.g. walldata.solutions]")
+    print(randsolutions)
 
 
 def makeverboserun() -> None:
@@ -201,26 +262,22 @@ def makeverboserun() -> None:
     ] = []
 
     for solvershort in solvers_short:
-        for count in range(0, len(walldataset)):
+        for count, (dim, start, grid) in enumerate(_PREBUILT):
             longestpath: Optional[List[ExcelCoordinate]] = None
             shortestpath: Optional[List[ExcelCoordinate]] = None
             exitloc: Optional[GridLocation] = None
             exitcount: int = -1
 
-            dim, start, wlist = walldataset[count]
-
             print(f"WORKING ON WALLDATASET #{count}")
             print(f"Trying to use {solvershort.__name__} for find all paths...")  # type: ignore
-            # walls_ordered: OrderedSet[GridLocation] = OrderedSet([GridLocation(*extracteinfo(w)) for w in wlist])
-            grid: SquareGrid = SquareGrid.from_excel_array(dimension=dim, walldata=wlist)
 
             try:
                 exits: List[GridNode] = find_all_exits(grid, start, solvershort)
                 exitcount = len(exits)
 
                 if len(exits) >= 1:
-                    steps: OrderedSet[GridLocation] = OrderedSet(backtrack_node_to_start(exits[0]))
-                    shortestpath = [ExcelCoordinate(k) for k in get_steps_as_excel_list(steps)]
+                    steps: List[GridLocation] = backtrack_node_to_start(exits[0])
+                    shortestpath = list(map(ExcelCoordinate, get_steps_as_excel_list(steps)))
 
                     exitloc = exits[0].location
 
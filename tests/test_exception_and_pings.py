@@ -46,6 +46,22 @@ async def test_ready_plaintext(fastapi_client: AsyncClient) -> None:
     assert response.text == "status: ready"
 
 
+async def test_health_json_route(fastapi_client: AsyncClient) -> None:
+    response: Response = await fastapi_client.get("/healthz.json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers.get("Content-Type") == "application/json"
+    assert response.json()["status"] == "alive"
+
+
+async def test_ready_json_route(fastapi_client: AsyncClient) -> None:
+    response: Response = await fastapi_client.get("/ready.json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers.get("Content-Type") == "application/json"
+    assert response.json()["status"] == "ready"
+
+
 async def test_exception(fastapi_client: AsyncClient) -> None:
     response: Response = await fastapi_client.get("/exceptme")
     data: Optional[dict[str, str | int | dict]] = response.json()
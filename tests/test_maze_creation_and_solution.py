@@ -1,12 +1,12 @@
 import json
-from typing import List, Optional, Set, Tuple
+from typing import FrozenSet, List, Optional, Set, Tuple
 from uuid import UUID
 
 from fastapi import status
 from fastapi.testclient import TestClient
 from loguru import logger
 
-from mazemaster.datastructures.models_and_schemas import MazeInput
+from tests.walldata import mazeinput, mazeinput2
 
 import pytest
 from httpx import AsyncClient, Response
@@ -15,94 +15,14 @@ from httpx import AsyncClient, Response
 # This is the same as using the @pytest.mark.anyio on all test functions in the module
 pytestmark = pytest.mark.anyio
 
-mazeinput: dict = {
-    "grid_size": "8x8",
-    "entrance": "A1",
-    "walls": [
-        "C1",
-        "G1",
-        "A2",
-        "C2",
-        "E2",
-        "G2",
-        "C3",
-        "E3",
-        "B4",
-        "C4",
-        "E4",
-        "F4",
-        "G4",
-        "B5",
-        "E5",
-        "B6",
-        "D6",
-        "E6",
-        "G6",
-        "H6",
-        "B7",
-        "D7",
-        "G7",
-        "B8",
-    ],
-}
+# the input side of the wall comparisons is constant => build it once per module
+_MAZEINPUT_WALLS: FrozenSet[str] = frozenset(mazeinput["walls"])
+_MAZEINPUT2_WALLS: FrozenSet[str] = frozenset(mazeinput2["walls"])
+
 mazesolution: List[str] = ["A1", "B1", "B2", "B3", "A3", "A4", "A5", "A6", "A7", "A8"]
 mazesolution_max: List[str] = ["A1", "B1", "B2", "B3", "A3", "A4", "A5", "A6", "A7", "A8"]
 
 
-mazeinput2: dict = {
-    "grid_size": "10x10",
-    "entrance": "A1",
-    "walls": [
-        "E4",
-        "E10",
-        "D8",
-        "F5",
-        "F8",
-        "I4",
-        "I10",
-        "A6",
-        "C3",
-        "I7",
-        "B4",
-        "B10",
-        "G6",
-        "D1",
-        "F1",
-        "D10",
-        "F4",
-        "I3",
-        "F10",
-        "J8",
-        "I6",
-        "A2",
-        "A8",
-        "I9",
-        "A5",
-        "B6",
-        "H10",
-        "E2",
-        "E8",
-        "E5",
-        "J1",
-        "F6",
-        "J4",
-        "I2",
-        "I8",
-        "J10",
-        "B2",
-        "A4",
-        "J7",
-        "A7",
-        "C4",
-        "C10",
-        "B8",
-        "C7",
-        "H6",
-        "G4",
-        "G10",
-        "H9",
-    ],
-}
 mazesolution2: List[str] = [
     "A1",
     "B1",
@@ -156,50 +76,20 @@ mazesolution2_max: List[str] = [
     "A10",
 ]
 
-# access_token, refresh_token, username, use
-@pytest.fixture(scope="module")
-async def maze_create(
-    fastapi_client: AsyncClient, create_user_modulescoped: Tuple[str, str, str, UUID]
-) -> Tuple[int, UUID, str]:
-
-    response_post: Response = await fastapi_client.post(
-        "/maze",
-        headers={"Authorization": f"Bearer {create_user_modulescoped[0]}", "content-type": "application/json"},
-        json=mazeinput,  # here, not really necessary to dump and re-load
-    )
-
-    response_post_json: dict = response_post.json()
 
-    assert response_post.status_code == status.HTTP_201_CREATED
-    assert UUID(response_post_json["owner_id"]) == create_user_modulescoped[3]
-    assert response_post_json["hash"] == MazeInput(**mazeinput).get_maze_hash()
-    assert int(response_post_json["mazenum"]) == 1
-    assert "id" in response_post_json
+def _project(response_json: dict) -> dict:
+    """the identifying fields of a maze-response (typed like the fixture-values) => one comparison per test"""
+    return {
+        "owner_id": UUID(response_json["owner_id"]),
+        "hash": response_json["hash"],
+        "mazenum": int(response_json["mazenum"]),
+        "id": UUID(response_json["id"]),
+    }
 
-    return 1, UUID(response_post_json["id"]), response_post_json["hash"]
-
-
-@pytest.fixture(scope="module")
-async def maze_create2(
-    fastapi_client: AsyncClient, create_user_modulescoped: Tuple[str, str, str, UUID]
-) -> Tuple[int, UUID, str]:
-
-    response_post: Response = await fastapi_client.post(
-        "/maze",
-        headers={"Authorization": f"Bearer {create_user_modulescoped[0]}", "content-type": "application/json"},
-        json=mazeinput2,  # here, not really necessary to dump and re-load
-    )
 
-    response_post_json: dict = response_post.json()
-    logger.debug(response_post_json)
-
-    assert response_post.status_code == status.HTTP_201_CREATED
-    assert UUID(response_post_json["owner_id"]) == create_user_modulescoped[3]
-    assert response_post_json["hash"] == MazeInput(**mazeinput2).get_maze_hash()
-    assert int(response_post_json["mazenum"]) == 2
-    assert "id" in response_post_json
-
-    return 2, UUID(response_post_json["id"]), response_post_json["hash"]
+def _expected_maze(owner_id: UUID, maze: Tuple[int, UUID, str]) -> dict:
+    """same fields from the maze_create-fixture-tuple (mazenum, id, hash)"""
+    return {"owner_id": owner_id, "hash": maze[2], "mazenum": maze[0], "id": maze[1]}
 
 
 async def test_maze_get_by_num(
@@ -215,15 +105,9 @@ async def test_maze_get_by_num(
     response_get_json: dict = response_get.json()
 
     assert response_get.status_code == status.HTTP_200_OK
-    assert UUID(response_get_json["owner_id"]) == create_user_modulescoped[3]
-    assert response_get_json["hash"] == maze_create[2]
-    assert int(response_get_json["mazenum"]) == maze_create[0]
-    assert UUID(response_get_json["id"]) == maze_create[1]
+    assert _project(response_get_json) == _expected_maze(create_user_modulescoped[3], maze_create)
 
-    inwallsset: Set = set(mazeinput["walls"])
-    outwallsset: Set = set(response_get_json["walls"])
-
-    assert len(inwallsset.symmetric_difference(outwallsset)) == 0
+    assert _MAZEINPUT_WALLS == frozenset(response_get_json["walls"])
 
 
 async def test_maze_get_by_num2(
@@ -241,15 +125,9 @@ async def test_maze_get_by_num2(
     logger.debug(response_get_json)
 
     assert response_get.status_code == status.HTTP_200_OK
-    assert UUID(response_get_json["owner_id"]) == create_user_modulescoped[3]
-    assert response_get_json["hash"] == maze_create2[2]
-    assert int(response_get_json["mazenum"]) == maze_create2[0]
-    assert UUID(response_get_json["id"]) == maze_create2[1]
-
-    inwallsset: Set = set(mazeinput2["walls"])
-    outwallsset: Set = set(response_get_json["walls"])
+    assert _project(response_get_json) == _expected_maze(create_user_modulescoped[3], maze_create2)
 
-    assert len(inwallsset.symmetric_difference(outwallsset)) == 0
+    assert _MAZEINPUT2_WALLS == frozenset(response_get_json["walls"])
 
 
 async def test_maze_get_by_id(
@@ -264,18 +142,10 @@ async def test_maze_get_by_id(
 
     response_get_json: dict = response_get.json()
 
-    response_get_json: dict = response_get.json()
-
     assert response_get.status_code == status.HTTP_200_OK
-    assert UUID(response_get_json["owner_id"]) == create_user_modulescoped[3]
-    assert response_get_json["hash"] == maze_create[2]
-    assert int(response_get_json["mazenum"]) == maze_create[0]
-    assert UUID(response_get_json["id"]) == maze_create[1]
-
-    inwallsset: Set = set(mazeinput["walls"])
-    outwallsset: Set = set(response_get_json["walls"])
+    assert _project(response_get_json) == _expected_maze(create_user_modulescoped[3], maze_create)
 
-    assert len(inwallsset.symmetric_difference(outwallsset)) == 0
+    assert _MAZEINPUT_WALLS == frozenset(response_get_json["walls"])
 
 
 async def test_maze_solve_min(
@@ -298,7 +168,7 @@ async def test_maze_solve_min(
     inpathset: Set = set(mazesolution)
     outpathset: Set = set(response_get_json["path"])
 
-    assert len(inpathset.symmetric_difference(outpathset)) == 0
+    assert inpathset == outpathset
 
 
 async def test_maze_solve_max(
@@ -322,7 +192,7 @@ async def test_maze_solve_max(
     inpathset: Set = set(mazesolution_max)
     outpathset: Set = set(response_get_json["path"])
 
-    assert len(inpathset.symmetric_difference(outpathset)) == 0
+    assert inpathset == outpathset
 
 
 async def test_maze_solve_min2(
@@ -346,7 +216,7 @@ async def test_maze_solve_min2(
     inpathset: Set = set(mazesolution2)
     outpathset: Set = set(response_get_json["path"])
 
-    assert len(inpathset.symmetric_difference(outpathset)) == 0
+    assert inpathset == outpathset
 
 
 async def test_maze_solve_max2(
@@ -370,4 +240,4 @@ async def test_maze_solve_max2(
     inpathset: Set = set(mazesolution2_max)
     outpathset: Set = set(response_get_json["path"])
 
-    assert len(inpathset.symmetric_difference(outpathset)) == 0
+    assert inpathset == outpathset
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from mazemaster.solvers.gridmodels import Queue, Stack
+from mazemaster.solvers.gridmodels import GridLocation, GridNode, Queue, Stack
 
 
 # This is the same as using the @pytest.mark.anyio on all test functions in the module
@@ -22,6 +22,19 @@ def test_container():
         print(k)
 
 
+def test_gridnode_slotted_and_visited():
+    root: GridNode = GridNode(location=GridLocation(0, 0), parent=None)
+    child: GridNode = GridNode(location=GridLocation(1, 0), parent=root, cost=1.0)
+    grandchild: GridNode = GridNode(location=GridLocation(1, 1), parent=child, cost=2.0)
+
+    assert not hasattr(grandchild, "__dict__")
+
+    assert grandchild.has_visited(GridLocation(1, 1))
+    assert grandchild.has_visited(GridLocation(1, 0))
+    assert not grandchild.has_visited(GridLocation(0, 0))  # root is not part of the visited-set
+    assert not child.has_visited(GridLocation(1, 1))
+
+
 # def test_mazehash():
 #     for dim, start, wlist in walldataset:
 #         walls_unsorted: List[ExcelCoordinate] = [ExcelCoordinate(k) for k in wlist]  # value=k
@@ -24,7 +24,7 @@ async def test_me(fastapi_client: AsyncClient, create_user_modulescoped: Tuple[s
 
 
 async def test_password_change(
-    fastapi_client: AsyncClient, create_user_modulescoped: Tuple[str, str, str, UUID]
+    fastapi_client: AsyncClient, create_user_modulescoped: Tuple[str, str, str, UUID], user_password: str
 ) -> None:
     jsoninput: dict = {"password": "lalaHUHU1234!"}
 
@@ -37,3 +37,12 @@ async def test_password_change(
     print(response_json)
 
     assert response.status_code == status.HTTP_200_OK
+
+    # user is shared across the test-modules => later modules log in with the original password
+    response = await fastapi_client.patch(
+        "/me",
+        headers={"Authorization": f"Bearer {create_user_modulescoped[0]}", "content-type": "application/json"},
+        json={"password": user_password},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import random
-from typing import List, Optional, Tuple, Iterator, Match
+from typing import List, Optional, Tuple, Match
 
+import pytest
 from loguru import logger
 
 from mazemaster.datastructures.models_and_schemas import (
@@ -19,26 +20,33 @@ from mazemaster.datastructures.models_and_schemas import (
 # password (i.e. iTk19!n)
 
 
-def test_grid_size_pattern():
-    for i in range(-1000, 1000):
-        for k in range(-1000, 1000):
-            gs: str = f"{i}x{k}"
-            m: Match = _gridsize_pattern_compiled.match(gs)
+# equivalence classes of the pattern (negative, zero, one, two, multi-digit, boundaries of the former full scan)
+_grid_size_boundaries: List[int] = [-1000, -999, -10, -2, -1, 0, 1, 2, 3, 9, 10, 99, 100, 999, 1000, 123456]
 
-            if i <= 0 or k <= 1:
-                if m:
-                    logger.debug(f"GS {gs=}")
+_grid_size_samples: List[Tuple[int, int]] = [(i, k) for i in _grid_size_boundaries for k in _grid_size_boundaries]
+_grid_size_rng: random.Random = random.Random(4711)  # fixed seed => reproducible sample from the former full scan
+_grid_size_samples += [(_grid_size_rng.randint(-1000, 999), _grid_size_rng.randint(-1000, 999)) for _ in range(0, 200)]
 
-                assert not m
-                continue
 
-            if not m:
-                logger.debug(f"GS {gs=} {m=}")
+@pytest.mark.parametrize("i,k", _grid_size_samples)
+def test_grid_size_pattern(i: int, k: int):
+    gs: str = f"{i}x{k}"
+    m: Optional[Match] = _gridsize_pattern_compiled.match(gs)
 
-            assert m
+    if i <= 0 or k <= 1:
+        if m:
+            logger.debug(f"GS {gs=}")
 
-            comp: str = f"{m.groups()[0]}x{m.groups()[1]}"
-            assert gs == comp
+        assert not m
+        return
+
+    if not m:
+        logger.debug(f"GS {gs=} {m=}")
+
+    assert m
+
+    comp: str = f"{m.groups()[0]}x{m.groups()[1]}"
+    assert gs == comp
 
 
 def test_password_pattern():
@@ -50,10 +58,10 @@ def test_password_pattern():
         ("1Jjajauuhupp88!!!", True),
     ]
 
+    fullmatch = _password_pattern_compiled.fullmatch
     for to_test_password, expeted_ok in testpass:
-        mi: Iterator[Match] = _password_pattern_compiled.finditer(to_test_password)
-        for m in mi:
-            assert not m or expeted_ok
+        m: Optional[Match] = fullmatch(to_test_password)
+        assert bool(m) == expeted_ok
 
 
 def test_username_pattern():
@@ -64,7 +72,7 @@ def test_username_pattern():
         ("11111123!", False),
     ]
 
+    fullmatch = _username_pattern_compiled.fullmatch
     for to_test_username, expeted_ok in testuser:
-        mi: Iterator[Match] = _username_pattern_compiled.finditer(to_test_username)
-        for m in mi:
-            assert not m or expeted_ok
+        m: Optional[Match] = fullmatch(to_test_username)
+        assert bool(m) == expeted_ok
@@ -460,3 +460,90 @@ solutions: List[Tuple[Optional[GridLocation], int, List[str], List[str]]] = [
         ],
     ),
 ]
+
+# maze-inputs for the http-tests (=> created once per session by the maze_create-fixtures in conftest)
+mazeinput: dict = {
+    "grid_size": "8x8",
+    "entrance": "A1",
+    "walls": [
+        "C1",
+        "G1",
+        "A2",
+        "C2",
+        "E2",
+        "G2",
+        "C3",
+        "E3",
+        "B4",
+        "C4",
+        "E4",
+        "F4",
+        "G4",
+        "B5",
+        "E5",
+        "B6",
+        "D6",
+        "E6",
+        "G6",
+        "H6",
+        "B7",
+        "D7",
+        "G7",
+        "B8",
+    ],
+}
+
+mazeinput2: dict = {
+    "grid_size": "10x10",
+    "entrance": "A1",
+    "walls": [
+        "E4",
+        "E10",
+        "D8",
+        "F5",
+        "F8",
+        "I4",
+        "I10",
+        "A6",
+        "C3",
+        "I7",
+        "B4",
+        "B10",
+        "G6",
+        "D1",
+        "F1",
+        "D10",
+        "F4",
+        "I3",
+        "F10",
+        "J8",
+        "I6",
+        "A2",
+        "A8",
+        "I9",
+        "A5",
+        "B6",
+        "H10",
+        "E2",
+        "E8",
+        "E5",
+        "J1",
+        "F6",
+        "J4",
+        "I2",
+        "I8",
+        "J10",
+        "B2",
+        "A4",
+        "J7",
+        "A7",
+        "C4",
+        "C10",
+        "B8",
+        "C7",
+        "H6",
+        "G4",
+        "G10",
+        "H9",
+    ],
+}